@@ -0,0 +1,138 @@
+"""Cheetah .atlas parser, usable without Blender"""
+
+# An .atlas file is a "textures: <image>" header followed by one tab
+# separated line per frame:
+#   name  xPos  yPos  width  height  xOffset  yOffset  origW  origH  [r]
+# 'r' marks a frame packed rotated by 90 degrees clockwise.
+
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+class AtlasParseError(ValueError):
+    def __init__(self, path, lineNumber, line, reason):
+        ValueError.__init__(self, "%s:%d: %s: %r" % (path, lineNumber, reason, line))
+        self.path = path
+        self.lineNumber = lineNumber
+        self.line = line
+        self.reason = reason
+
+    def __reduce__(self):
+        # keeps the error picklable across a process pool
+        return (AtlasParseError, (self.path, self.lineNumber, self.line, self.reason))
+
+class Frame:
+    __slots__ = ('name', 'xPos', 'yPos', 'width', 'height', 'xOffset', 'yOffset', 'origW', 'origH', 'rotated')
+
+    def __init__(self, name, xPos, yPos, width, height, xOffset, yOffset, origW, origH, rotated):
+        self.name = name
+        self.xPos = xPos
+        self.yPos = yPos
+        self.width = width
+        self.height = height
+        self.xOffset = xOffset
+        self.yOffset = yOffset
+        self.origW = origW
+        self.origH = origH
+        self.rotated = rotated
+
+    def rect(self):
+        return (self.xPos, self.yPos, self.width, self.height, self.xOffset, self.yOffset, self.origW, self.origH, self.rotated)
+
+    def __eq__(self, other):
+        return isinstance(other, Frame) and self.name == other.name and self.rect() == other.rect()
+
+    def __repr__(self):
+        return 'Frame(%r, %r)' % (self.name, self.rect())
+
+class ParsedAtlas:
+    __slots__ = ('path', 'texture', 'frames')
+
+    def __init__(self, path, texture, frames):
+        self.path = path
+        self.texture = texture
+        self.frames = frames
+
+def toInt(value):
+    try: return int(value)
+    except ValueError: return int(float(value))
+
+def iterFrames(lines, path='<atlas>'):
+    """Yield a Frame per frame line, skipping the header and blank lines"""
+    for lineNumber, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if not line or line[:9] == "textures:": continue
+        fields = line.split('\t')
+        if len(fields) < 9:
+            raise AtlasParseError(path, lineNumber, line, "expected at least 9 tab separated fields, got %d" % len(fields))
+        try:
+            yield Frame(fields[0],
+                        toInt(fields[1]), toInt(fields[2]), toInt(fields[3]), toInt(fields[4]),
+                        toInt(fields[5]), toInt(fields[6]), toInt(fields[7]), toInt(fields[8]),
+                        len(fields) > 9 and fields[9] == 'r')
+        except ValueError:
+            raise AtlasParseError(path, lineNumber, line, "non numeric frame field")
+
+def readAtlas(path):
+    texture = None
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            header = f.readline()
+            if header[:9] == "textures:": texture = header[9:].strip()
+            f.seek(0)
+            frames = list(iterFrames(f, path))
+        except UnicodeDecodeError as e:
+            raise AtlasParseError(path, 0, e.object[max(0, e.start - 20):e.end], "not utf-8 encoded")
+    return ParsedAtlas(path, texture, frames)
+
+# path -> (mtime, size, ParsedAtlas)
+parsedAtlases = {}
+
+def parseAtlas(path):
+    """Parse path, reusing the previous result while mtime and size match"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    cached = parsedAtlases.get(path)
+    if cached is not None and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2]
+    parsed = readAtlas(path)
+    parsedAtlases[path] = (stat.st_mtime, stat.st_size, parsed)
+    return parsed
+
+def parseAtlases(paths, workers=None, processes=False):
+    """Parse many atlases in a thread or process pool.
+
+    Returns {absolute path: ParsedAtlas or the exception raised for it}.
+    Results go into the same cache as parseAtlas, so a later parseAtlas
+    call for an unchanged file returns immediately."""
+    results = {}
+    pending = []
+    for path in paths:
+        path = os.path.abspath(path)
+        try: stat = os.stat(path)
+        except OSError as e:
+            results[path] = e
+            continue
+        cached = parsedAtlases.get(path)
+        if cached is not None and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            results[path] = cached[2]
+        else: pending.append((path, stat))
+    if not pending: return results
+
+    executorClass = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executorClass(workers) as executor:
+        futures = [(path, stat, executor.submit(readAtlas, path)) for path, stat in pending]
+        for path, stat, future in futures:
+            try: parsed = future.result()
+            except (OSError, AtlasParseError) as e:
+                results[path] = e
+                continue
+            parsedAtlases[path] = (stat.st_mtime, stat.st_size, parsed)
+            results[path] = parsed
+    return results
+
+def readPngSize(path):
+    """(width, height) from the IHDR chunk without decoding, None if path is not a PNG"""
+    with open(path, 'rb') as f: header = f.read(24)
+    if len(header) < 24 or header[:8] != b'\x89PNG\r\n\x1a\n' or header[12:16] != b'IHDR': return None
+    return struct.unpack('>II', header[16:24])
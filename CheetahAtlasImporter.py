@@ -1,12 +1,77 @@
 import bpy
+from bpy.app.handlers import persistent
 from mathutils import Vector
 import bmesh
+import json
+import time
 
 cache = {}
+drivers = {} # driver objects in bpy.data order, used as an ordered set
+patternSequences = {} # pattern driver -> ((framePattern, startFrame, frameIncrement), frame ids)
+bakedTables = {} # scene name -> BakedTable
+frameTables = {} # atlas name -> FrameTable of atlases imported in table mode
+frameIndexBuilt = False # cache and frameTables cover the whole scene
+frameData = {} # (frame id, anchor point) -> anchored vertex, UV buffers and material
+sharedMeshes = {} # (frame id, anchor point) -> mesh shared by sprites in shared mesh mode
+sharedMeshesIndexed = False # sharedMeshes covers every shared mesh in bpy.data
+images = {} # absolute image path -> image datablock, shared between atlases
+materials = {} # absolute image path -> material, shared between atlases
 
 def unix_slashes(input):
     return input.replace('\\','/')
 
+############ profiling
+# Off by default (scene.cheetah_profile). Callers check the flag themselves
+# so the disabled path costs a single property read.
+
+class Profiler:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counters = {}
+        self.timings = {}
+
+    def count(self, key, amount=1):
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def addTime(self, key, seconds):
+        timing = self.timings.get(key)
+        if timing is None: self.timings[key] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            if seconds > timing[2]: timing[2] = seconds
+
+    def summary(self):
+        timings = {}
+        for key, (count, total, maximum) in self.timings.items():
+            timings[key] = {'count': count, 'total': total, 'mean': total / count, 'max': maximum}
+        return {'counters': dict(self.counters), 'timings': timings}
+
+    def dump(self, filepath):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2, sort_keys=True)
+
+profiler = Profiler()
+
+def dumpProfile(scene):
+    if not scene.cheetah_profile or not scene.cheetah_profile_path: return
+    profiler.dump(bpy.path.abspath(scene.cheetah_profile_path))
+
+@persistent
+def dumpProfileHandler(scene):
+    dumpProfile(scene)
+
+class ResetProfileOperator(bpy.types.Operator):
+    """Clear the collected profile counters and timings"""
+    bl_idname = "cheetah.reset_profile"
+    bl_label = "Reset Profile"
+
+    def execute(self, context):
+        profiler.reset()
+        return {'FINISHED'}
+
 class CheetahAtlasLayout(bpy.types.Panel):
     """Cheetah atlas import"""
     bl_label = "Cheetah Atlas Tools"
@@ -24,13 +89,40 @@ class CheetahAtlasLayout(bpy.types.Panel):
         
         row = layout.row()
         row.prop(bpy.context.scene, "cheetah_pixel_per_unit")
+        row = layout.row()
+        row.prop(bpy.context.scene, "cheetah_proxy", expand=True)
         
         row = layout.row()
         row.prop(bpy.context.scene, "cheetah_relpath")
 
+        row = layout.row()
+        row.prop(scene, "cheetah_profile")
+        row.prop(scene, "cheetah_profile_path", text="")
+        row.operator("cheetah.reset_profile", text="", icon='X')
+
         layout.label(text="Import atlas:")
         row = layout.row()
         row.operator("cheetah.atlas_import")
+        row.operator("cheetah.atlas_import_directory", text="Import Directory")
+        row = layout.row()
+        row.operator("cheetah.atlas_reimport")
+        row.operator("cheetah.atlas_pack")
+        row = layout.row()
+        row.operator("cheetah.frame_usage")
+
+        row = layout.row()
+        row.operator("cheetah.refresh_drivers")
+        row = layout.row()
+        row.operator("cheetah.sprite_mesh_mode")
+        row.operator("cheetah.purge_frame_meshes")
+        row = layout.row()
+        row.operator("cheetah.batch_sprites")
+        row.operator("cheetah.unbatch_sprites")
+
+        row = layout.row()
+        if 'cheetahBakeTable' in scene: row.operator("cheetah.clear_baked_frames")
+        else: row.operator("cheetah.bake_frames")
+        row.operator("cheetah.export_runtime")
 
 # anchor point
 
@@ -72,8 +164,7 @@ class SetAnchorPointOperator(bpy.types.Operator):
     anchorPoint = bpy.props.FloatVectorProperty(size=2)
   
     def execute(self, context):  
-        setAnchorPoint(context.active_object, self.anchorPoint)
-        persistAnchorPoint(context.active_object, self.anchorPoint)
+        setSpriteAnchorPoint(context.active_object, self.anchorPoint)
         return {'FINISHED'}  
     
     def draw(self, context):
@@ -87,6 +178,20 @@ class SetAnchorPointOperator(bpy.types.Operator):
         else: self.anchorPoint = getAnchorPointActual(context.active_object)
         return self.execute(context)
 
+class SetAnchorPointSelectedOperator(bpy.types.Operator):
+    """Set the same anchor point on all selected sprites"""
+    bl_idname = "object.set_anchor_point_selected"
+    bl_label = "Set Anchor Point On Selected"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    anchorPoint = bpy.props.FloatVectorProperty(size=2, default=(0.5, 0.5))
+
+    def execute(self, context):
+        anchor = tuple(self.anchorPoint)
+        for ob in context.selected_objects:
+            if ob.type == 'MESH' and 'sprite' in ob: setSpriteAnchorPoint(ob, anchor)
+        return {'FINISHED'}
+
 def getAnchorPointStored(ob):
     if '_anchorPoint0' in ob: return (ob['_anchorPoint0'], ob['_anchorPoint1'])
     else: return False
@@ -97,6 +202,94 @@ def restoreAnchorPoint(ob):
     if anchorStored: setAnchorPoint(ob, anchorStored)
 
 import os.path
+import sys
+import glob
+import multiprocessing
+import bisect
+import csv
+import re
+
+# CheetahAtlas lives next to this file and has no Blender dependency
+addonDirectory = os.path.dirname(os.path.abspath(__file__))
+if addonDirectory not in sys.path: sys.path.append(addonDirectory)
+import CheetahAtlas
+
+try: import numpy
+except ImportError: numpy = None
+
+# Frames are CheetahAtlas.Frame records. A frame quad has 4 face vertices plus two loose helper vertices at the
+# origin and at (origW, origH) that keep the untrimmed bounds for anchoring.
+
+def frameGeometry(frame, unitPerPixel, imgW, imgH):
+    xPos, yPos, width, height, xOffset, yOffset, origW, origH, rotated = frame.rect()
+    if not rotated:
+        left, top, quadW, quadH = xOffset, origH - yOffset, width, height
+    else:
+        left, top, quadW, quadH = yOffset, origH - xOffset, height, width
+    verts = [(left * unitPerPixel, 0.0, top * unitPerPixel),
+             ((left + quadW) * unitPerPixel, 0.0, top * unitPerPixel),
+             ((left + quadW) * unitPerPixel, 0.0, (top - quadH) * unitPerPixel),
+             (left * unitPerPixel, 0.0, (top - quadH) * unitPerPixel),
+             (0.0, 0.0, 0.0),
+             (origW * unitPerPixel, 0.0, origH * unitPerPixel)]
+    u0 = float(xPos) / float(imgW)
+    u1 = float(xPos + width) / float(imgW)
+    vTop = float(imgH - yPos) / float(imgH)
+    vBottom = float(imgH - yPos - height) / float(imgH)
+    if not rotated: uvs = [(u0, vTop), (u1, vTop), (u1, vBottom), (u0, vBottom)]
+    else: uvs = [(u1, vTop), (u1, vBottom), (u0, vBottom), (u0, vTop)]
+    return verts, uvs
+
+def frameBounds(frame, unitPerPixel):
+    """(minX, minZ, maxX, maxZ) of a frame quad including the helper vertices"""
+    if not frame.rotated:
+        left, top, quadW, quadH = frame.xOffset, frame.origH - frame.yOffset, frame.width, frame.height
+    else:
+        left, top, quadW, quadH = frame.yOffset, frame.origH - frame.xOffset, frame.height, frame.width
+    return [min(0, left) * unitPerPixel, min(0, top - quadH) * unitPerPixel,
+            max(frame.origW, left + quadW) * unitPerPixel, max(frame.origH, top) * unitPerPixel]
+
+def vertsBounds(verts):
+    xs = verts[0::3]
+    zs = verts[2::3]
+    return [min(xs), min(zs), max(xs), max(zs)]
+
+def frameArrays(frames, unitPerPixel, imgW, imgH):
+    """Flat vertex (18 floats) and UV (8 floats) arrays for all frames"""
+    if numpy is None:
+        verts = []
+        uvs = []
+        for frame in frames:
+            frameVerts, frameUvs = frameGeometry(frame, unitPerPixel, imgW, imgH)
+            for v in frameVerts: verts.extend(v)
+            for uv in frameUvs: uvs.extend(uv)
+        return verts, uvs
+
+    data = numpy.array([frame.rect() for frame in frames], dtype=numpy.float64).reshape(-1, 9)
+    xPos, yPos, width, height, xOffset, yOffset, origW, origH, rotated = data.T
+    rotated = rotated > 0
+    left = numpy.where(rotated, yOffset, xOffset)
+    top = origH - numpy.where(rotated, xOffset, yOffset)
+    right = left + numpy.where(rotated, height, width)
+    bottom = top - numpy.where(rotated, width, height)
+
+    verts = numpy.zeros((len(frames), 6, 3), dtype=numpy.float32)
+    verts[:, (0, 3), 0] = left[:, None]
+    verts[:, (1, 2), 0] = right[:, None]
+    verts[:, (0, 1), 2] = top[:, None]
+    verts[:, (2, 3), 2] = bottom[:, None]
+    verts[:, 5, 0] = origW
+    verts[:, 5, 2] = origH
+    verts *= unitPerPixel
+
+    u0 = xPos / imgW
+    u1 = (xPos + width) / imgW
+    vTop = (imgH - yPos) / imgH
+    vBottom = (imgH - yPos - height) / imgH
+    uvs = numpy.empty((len(frames), 4, 2), dtype=numpy.float32)
+    uvs[:, :, 0] = numpy.where(rotated[:, None], numpy.stack((u1, u1, u0, u0), 1), numpy.stack((u0, u1, u1, u0), 1))
+    uvs[:, :, 1] = numpy.where(rotated[:, None], numpy.stack((vTop, vBottom, vBottom, vTop), 1), numpy.stack((vTop, vTop, vBottom, vBottom), 1))
+    return verts.ravel(), uvs.ravel()
 
 
 # ImportHelper is a helper class, defines filename and
@@ -105,6 +298,447 @@ from bpy_extras.io_utils import ImportHelper
 from bpy.props import StringProperty, BoolProperty, EnumProperty
 from bpy.types import Operator
 
+# Table mode stores an atlas without frame objects. The atlas empty keeps
+# the frame names, one 18 float vertex row per distinct frame geometry,
+# the geometry row of every frame and 8 UV floats per frame. Sprites copy
+# their quad straight from these rows.
+
+def storeFrameTable(atlas, frames, unitPerPixel, imgW, imgH):
+    verts, uvs = frameArrays(frames, unitPerPixel, imgW, imgH)
+    storeFrameRows(atlas, [frame.name for frame in frames], verts, uvs,
+                   [v for frame in frames for v in frameRect(frame)],
+                   [v for frame in frames for v in frameBounds(frame, unitPerPixel)])
+
+def storeFrameRows(atlas, names, verts, uvs, rects, bounds):
+    """Store flat per frame arrays (18 vertex, 8 UV, 9 rect and 4 bounds floats) as the frame table"""
+    geometries = []
+    geometryIndex = []
+    rows = {}
+    for i in range(len(names)):
+        row = tuple(round(float(v), 6) for v in verts[i * 18:i * 18 + 18])
+        if row not in rows:
+            rows[row] = len(rows)
+            geometries.extend(row)
+        geometryIndex.append(rows[row])
+    atlas['frameNames'] = '\n'.join(names)
+    atlas['frameGeometries'] = geometries
+    atlas['frameGeometryIndex'] = geometryIndex
+    atlas['frameUvs'] = [float(uv) for uv in uvs]
+    atlas['frameRects'] = [int(v) for v in rects]
+    atlas['frameBounds'] = [float(v) for v in bounds]
+
+class FrameTable:
+    """Python side copy of a table mode atlas"""
+    def __init__(self, atlas):
+        self.atlas = atlas
+        self.names = atlas['frameNames'].split('\n')
+        self.index = dict((name, i) for i, name in enumerate(self.names))
+        self.geometries = atlas['frameGeometries'].to_list()
+        self.geometryIndex = atlas['frameGeometryIndex'].to_list()
+        self.uvs = atlas['frameUvs'].to_list()
+        if 'frameBounds' in atlas: self.bounds = atlas['frameBounds'].to_list()
+        else: self.bounds = [v for i in range(len(self.names)) for v in vertsBounds(self.frameVerts(i))]
+        self.material = findAtlasMaterial(atlas)
+
+    def find(self, name):
+        index = self.index.get(name)
+        if index is None: return None
+        return (self, index)
+
+    def frameVerts(self, index):
+        row = self.geometryIndex[index] * 18
+        return self.geometries[row:row + 18]
+
+    def frameUvs(self, index):
+        return self.uvs[index * 8:index * 8 + 8]
+
+    def frameBounds(self, index):
+        return self.bounds[index * 4:index * 4 + 4]
+
+def newQuadMesh(name, verts, uvs):
+    """Mesh with the frame quad layout: 4 face vertices, 2 loose helper vertices, one UV layer"""
+    mesh = bpy.data.meshes.new(name=name)
+    mesh.vertices.add(6)
+    mesh.vertices.foreach_set('co', verts)
+    mesh.loops.add(4)
+    mesh.loops.foreach_set('vertex_index', (0, 1, 2, 3))
+    mesh.polygons.add(1)
+    mesh.polygons.foreach_set('loop_start', (0,))
+    mesh.polygons.foreach_set('loop_total', (4,))
+    mesh.uv_textures.new()
+    mesh.uv_layers[0].data.foreach_set('uv', uvs)
+    mesh.update(calc_edges=True)
+    return mesh
+
+def createFrameMeshes(frames, unitPerPixel, imgW, imgH, img, mat, parent, layers):
+    profile = bpy.context.scene.cheetah_profile
+    if profile: start = time.perf_counter()
+    verts, uvs = frameArrays(frames, unitPerPixel, imgW, imgH)
+    scn = bpy.context.scene
+    obs = []
+    for i, frame in enumerate(frames):
+        mesh = newQuadMesh(frame.name, verts[i * 18:i * 18 + 18], uvs[i * 8:i * 8 + 8])
+        mesh.uv_textures[0].data[0].image = img
+        mesh.materials.append(mat)
+        
+        ob = bpy.data.objects.new(frame.name, mesh)
+        ob.parent = parent
+        ob.layers = layers
+        scn.objects.link(ob)
+        obs.append(ob)
+    if profile and frames: profiler.addTime('meshBuild', (time.perf_counter() - start) / len(frames))
+    return obs
+
+def frameRect(frame):
+    return [int(v) for v in frame.rect()]
+
+def updateFrameMesh(mesh, frame, unitPerPixel, imgW, imgH):
+    verts, uvs = frameGeometry(frame, unitPerPixel, imgW, imgH)
+    mesh.vertices.foreach_set('co', [c for v in verts for c in v])
+    mesh.uv_layers.active.data.foreach_set('uv', [c for uv in uvs for c in uv])
+    mesh.update()
+
+def createMesh(name, verts, uvs, img, mat, parent):
+    profile = bpy.context.scene.cheetah_profile
+    if profile: start = time.perf_counter()
+    edges = []
+    faces = [[0, 1, 2, 3]]
+
+    mesh = bpy.data.meshes.new(name=name)
+    mesh.from_pydata(verts, edges, faces)
+    
+    ob = bpy.data.objects.new(name, mesh)
+    scn = bpy.context.scene
+    scn.objects.link(ob)
+    scn.objects.active = ob
+    
+    ob.parent = parent
+    
+    mesh.update()
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    
+    uv_layer = bm.loops.layers.uv.verify()
+    bm.faces.layers.tex.verify()
+    
+    # adjust UVs
+    for f in bm.faces:
+        for l in f.loops:
+            luv = l[uv_layer]
+            luv.uv = uvs[l.vert.index]
+    
+    bm.to_mesh(mesh)
+    bm.free()      
+    
+    # set uv faces image
+    for uv_face in ob.data.uv_textures.active.data:
+        uv_face.image = img
+    
+    ob.data.materials.append(mat)
+    
+    if profile: profiler.addTime('meshBuild', time.perf_counter() - start)
+    return ob
+
+def createEmpty(name, layers):
+    ob = bpy.data.objects.new(name, None)
+    ob.layers = layers
+    bpy.context.scene.objects.link(ob)
+    return ob
+
+def loadImage(filepath):
+    """Load filepath once, reusing an image datablock that already points at it"""
+    filepath = os.path.normpath(os.path.abspath(filepath))
+    img = images.get(filepath)
+    if img is not None:
+        try:
+            if img.filepath: return img
+        except ReferenceError: pass
+    for img in bpy.data.images:
+        if img.filepath and os.path.normpath(bpy.path.abspath(img.filepath)) == filepath: break
+    else: img = bpy.data.images.load(filepath=filepath)
+    images[filepath] = img
+    return img
+
+# Atlas materials are shared by every atlas using the same sheet. The
+# material remembers the sheet path in 'cheetahImage' and its texture stays
+# empty until the first sprite shows one of its frames, so importing never
+# decodes a sheet; the sheet size comes from the PNG header.
+
+def imageSize(filepath):
+    size = CheetahAtlas.readPngSize(filepath)
+    if size is None: size = tuple(loadImage(filepath).size)
+    return size
+
+def getAtlasMaterial(filepath):
+    filepath = os.path.normpath(os.path.abspath(filepath))
+    mat = materials.get(filepath)
+    if mat is not None:
+        try:
+            if mat.name: return mat
+        except ReferenceError: pass
+    for mat in bpy.data.materials:
+        if mat.get('cheetahImage') == filepath: break
+    else:
+        name = os.path.basename(filepath)
+        mat = bpy.data.materials.new(name)
+        # table mode atlases reference the material by name only
+        mat.use_fake_user = True
+        mat.use_shadeless = True
+        mat.use_transparency = True
+        mat['cheetahImage'] = filepath
+        
+        tex = bpy.data.textures.new(name, type = 'IMAGE')
+        mtex = mat.texture_slots.add()
+        mtex.texture = tex
+        mtex.texture_coords = 'UV'
+    materials[filepath] = mat
+    return mat
+
+def getMaterialImage(mat):
+    """Image of an atlas material, loaded on first use"""
+    tex = mat.texture_slots[0].texture
+    if tex.image is None and 'cheetahImage' in mat: tex.image = loadImage(atlasImagePath(mat['cheetahImage']))
+    return tex.image
+
+# With scene.cheetah_proxy set, atlas images show a 1/2 or 1/4 size copy of
+# the sheet in the viewport, written next to it as <sheet>.proxy2.png or
+# <sheet>.proxy4.png. A proxy carries the mtime of its sheet and is written
+# again when that differs. Renders switch every loaded atlas image to the
+# full size sheet and back afterwards; UVs are normalized, so they fit at
+# any size. Images that were never loaded are left alone.
+
+proxyScales = {'FULL': 1, 'HALF': 2, 'QUARTER': 4}
+proxyItems = (('FULL', "Full", "Show the atlas sheets at full size"),
+              ('HALF', "1/2", "Show half size copies of the atlas sheets in the viewport"),
+              ('QUARTER', "1/4", "Show quarter size copies of the atlas sheets in the viewport"))
+renderingFullSize = False
+
+def proxyPath(filepath, scale):
+    root, ext = os.path.splitext(filepath)
+    return root + '.proxy%d' % scale + ext
+
+def writeProxy(filepath, path, scale):
+    img = bpy.data.images.load(filepath)
+    try:
+        width, height = img.size
+        img.scale(max(1, width // scale), max(1, height // scale))
+        img.filepath_raw = path
+        img.file_format = 'PNG'
+        img.save()
+    finally: bpy.data.images.remove(img)
+
+def ensureProxy(filepath, scale):
+    """Proxy path of filepath, written when missing or out of date; filepath if no proxy can be made"""
+    if scale == 1: return filepath
+    path = proxyPath(filepath, scale)
+    try:
+        mtime = os.path.getmtime(filepath)
+        if not os.path.exists(path) or os.path.getmtime(path) != mtime:
+            writeProxy(filepath, path, scale)
+            os.utime(path, (mtime, mtime))
+    except (OSError, RuntimeError) as e:
+        print("no proxy for %s: %s" % (filepath, e))
+        return filepath
+    return path
+
+def atlasImagePath(filepath, scene=None):
+    """Sheet or proxy path for the current viewport setting"""
+    if renderingFullSize: return filepath
+    if scene is None: scene = bpy.context.scene
+    return ensureProxy(filepath, proxyScales[scene.cheetah_proxy])
+
+def switchAtlasImages(scene):
+    """Point every loaded atlas image at the sheet or proxy matching scene and the render state"""
+    for mat in bpy.data.materials:
+        if 'cheetahImage' not in mat or not mat.texture_slots[0]: continue
+        img = mat.texture_slots[0].texture.image
+        if img is None: continue
+        path = os.path.normpath(atlasImagePath(mat['cheetahImage'], scene))
+        if os.path.normpath(bpy.path.abspath(img.filepath)) == path: continue
+        img.filepath = path
+        img.reload()
+        images[path] = img
+
+def updateProxy(self, context):
+    switchAtlasImages(self)
+
+@persistent
+def fullSizeRenderHandler(scene):
+    global renderingFullSize
+    renderingFullSize = True
+    switchAtlasImages(scene)
+
+@persistent
+def proxyRenderHandler(scene):
+    global renderingFullSize
+    renderingFullSize = False
+    switchAtlasImages(scene)
+
+# Frame objects are placed from the parsed sizes before any of them exists:
+# 'STACK' puts every frame above the previous one in a single column,
+# 'GRID' fills rows of `columns` frames (square when 0), each column as wide
+# as its widest frame and each row as high as its highest.
+
+frameLayoutItems = (
+        ('STACK', "Stack", "One column, every frame above the previous one"),
+        ('GRID', "Grid", "Rows of frames, keeps large atlases compact in the viewport"),
+        )
+
+def frameLayout(frames, unitPerPixel, layout='STACK', columns=0):
+    """(x, z) location of every frame object"""
+    locations = []
+    if layout == 'GRID':
+        if columns <= 0: columns = max(1, int(ceil(sqrt(len(frames)))))
+        widths = [0] * columns
+        for i, frame in enumerate(frames): widths[i % columns] = max(widths[i % columns], frame.origW)
+        lefts = [0] * columns
+        for i in range(1, columns): lefts[i] = lefts[i - 1] + widths[i - 1]
+        bottom = 0
+        for row in range(0, len(frames), columns):
+            rowFrames = frames[row:row + columns]
+            for i in range(len(rowFrames)): locations.append((lefts[i] * unitPerPixel, bottom * unitPerPixel))
+            bottom += max(frame.origH for frame in rowFrames)
+    else:
+        bottom = 0
+        for frame in frames:
+            locations.append((0.0, bottom * unitPerPixel))
+            bottom += frame.origH
+    return locations
+
+def importAtlas(context, filepath, frameStorage='OBJECTS', batched=True, layout='STACK', columns=0):
+    """Import one .atlas file, returns the atlas empty or None if it was already imported"""
+    atlasesHolder = None
+    
+    # place to some layer TODO: make parameter
+    activeLayer = 10
+    layersSet = [
+        False, False, False, False, False,    False, False, False, False, False, 
+        False, False, False, False, False,    False, False, False, False, False  ]
+    layersSet[activeLayer] = True
+    oldLayerState = bpy.context.scene.layers[activeLayer]
+    bpy.context.scene.layers[activeLayer] = True
+    
+    if "atlases" in bpy.data.objects:
+        atlasesHolder = bpy.data.objects["atlases"]
+    else:
+        atlasesHolder = createEmpty("atlases", layersSet)
+
+    
+    # if atlas already exists, skip it
+    for atlas in atlasesHolder.children:
+        if atlas["path"] == filepath: 
+            bpy.context.scene.layers[activeLayer] = oldLayerState
+            return None
+    
+    profile = context.scene.cheetah_profile
+    if profile: start = time.perf_counter()
+    
+    imagePath = filepath.replace(".atlas",".png")
+    try:
+        parsed = CheetahAtlas.parseAtlas(filepath)
+        imgW, imgH = imageSize(imagePath)
+    except:
+        bpy.context.scene.layers[activeLayer] = oldLayerState
+        raise
+    
+    atlasHolder = createEmpty("atlas", layersSet)
+    atlasHolder.parent = atlasesHolder
+    atlasHolder['path'] = filepath
+
+    try: 
+        atlasHolder.name = unix_slashes(os.path.relpath(filepath, bpy.context.scene.cheetah_relpath))
+    except:
+        atlasHolder.name = unix_slashes(os.path.basename(filepath))
+    atlasHolder['name'] = atlasHolder.name
+    
+    mat = getAtlasMaterial(imagePath)
+    img = mat.texture_slots[0].texture.image
+    
+    frames = parsed.frames
+    
+    unitPerPixel = 1 / bpy.context.scene.cheetah_pixel_per_unit 
+    
+    atlasHolder['material'] = mat.name
+    atlasHolder['imageSize'] = [imgW, imgH]
+    atlasHolder['unitPerPixel'] = unitPerPixel
+    
+    if frameStorage == 'TABLE':
+        storeFrameTable(atlasHolder, frames, unitPerPixel, imgW, imgH)
+        frameTables[atlasHolder['name']] = FrameTable(atlasHolder)
+        frameObs = []
+    elif batched:
+        frameObs = createFrameMeshes(frames, unitPerPixel, imgW, imgH, img, mat, atlasHolder, layersSet)
+    else:
+        frameObs = []
+        for frame in frames:
+            verts, uvs = frameGeometry(frame, unitPerPixel, imgW, imgH)
+            ob = createMesh(frame.name, [Vector(v) for v in verts], [Vector(uv) for uv in uvs], img, mat, atlasHolder)
+            ob.layers = layersSet
+            frameObs.append(ob)
+    
+    locations = frameLayout(frames, unitPerPixel, layout, columns) if frameObs else []
+    for frame, ob, location in zip(frames, frameObs, locations):
+        ob["name"] = frame.name
+        ob["rect"] = frameRect(frame)
+        ob["bounds"] = frameBounds(frame, unitPerPixel)
+        cache[atlasHolder['name'] + '|' + frame.name] = ob
+        ob.location[0], ob.location[2] = location
+    frameCount = len(frames)
+    bpy.context.scene.layers[activeLayer] = oldLayerState
+    
+    bumpItemsVersion()
+    patternSequences.clear()
+    
+    if profile:
+        profiler.addTime('atlasImport', time.perf_counter() - start)
+        profiler.count('framesImported', frameCount)
+        dumpProfile(context.scene)
+    
+    return atlasHolder
+
+frameStorageItems = (('OBJECTS', "Frame Objects", "One mesh object per frame"),
+                     ('TABLE', "Frame Table", "Compact per-atlas table, geometry shared between identical frames"))
+
+def importAtlasDirectory(context, directory, pattern='*.atlas', recursive=False, processes=False, frameStorage='OBJECTS', batched=True, layout='STACK', columns=0):
+    """Import every atlas matching pattern in directory.
+
+    The files are parsed in a thread pool (or a process pool running
+    Blender's python) first, then the Blender data is created serially.
+    Returns a list of (path, seconds or exception) and the total seconds."""
+    start = time.perf_counter()
+    if recursive: paths = glob.glob(os.path.join(directory, '**', pattern), recursive=True)
+    else: paths = glob.glob(os.path.join(directory, pattern))
+    paths = sorted(os.path.abspath(path) for path in paths)
+    
+    if processes: multiprocessing.set_executable(bpy.app.binary_path_python)
+    parsed = CheetahAtlas.parseAtlases(paths, processes=processes)
+    
+    timings = []
+    wm = context.window_manager
+    wm.progress_begin(0, len(paths))
+    try:
+        for i, path in enumerate(paths):
+            result = parsed[path]
+            if isinstance(result, Exception):
+                timings.append((path, result))
+                continue
+            atlasStart = time.perf_counter()
+            try: importAtlas(context, path, frameStorage, batched, layout, columns)
+            except (OSError, RuntimeError, CheetahAtlas.AtlasParseError) as e:
+                timings.append((path, e))
+                continue
+            timings.append((path, time.perf_counter() - atlasStart))
+            wm.progress_update(i + 1)
+    finally:
+        wm.progress_end()
+    return timings, time.perf_counter() - start
+
+def printImportTimings(timings, total):
+    for path, result in timings:
+        if isinstance(result, Exception): print("%s: FAILED %s" % (path, result))
+        else: print("%s: %.3f s" % (path, result))
+    print("%d atlases in %.3f s" % (len(timings), total))
+
 class CheetahImportAtlas(Operator, ImportHelper):
     """Import an .atlas file"""
     bl_idname = "cheetah.atlas_import"  # important since its how bpy.ops.import_test.some_data is constructed
@@ -132,6 +766,19 @@ class CheetahImportAtlas(Operator, ImportHelper):
     #        default=True,
     #        )
 
+    batched = BoolProperty(
+            name="Batched Import",
+            description="Build all frame meshes from precomputed arrays instead of one BMesh per frame",
+            default=True,
+            )
+
+    frameStorage = EnumProperty(
+            name="Frame Storage",
+            description="How imported frames are stored",
+            items=frameStorageItems,
+            default='OBJECTS',
+            )
+
     #type = EnumProperty(
     #        name="Example Enum",
     #        description="Choose between two items",
@@ -140,229 +787,615 @@ class CheetahImportAtlas(Operator, ImportHelper):
     #        default='OPT_A',
     #        )
 
-    def createMesh(self, name, verts, uvs, img, mat, parent):
-        edges = []
-        faces = [[0, 1, 2, 3]]
-
-        mesh = bpy.data.meshes.new(name=name)
-        mesh.from_pydata(verts, edges, faces)
-        
-        ob = bpy.data.objects.new(name, mesh)
-        scn = bpy.context.scene
-        scn.objects.link(ob)
-        scn.objects.active = ob
-        
-        ob.parent = parent
-        
-        mesh.update()
-        bm = bmesh.new()
-        bm.from_mesh(mesh)
-        
-        uv_layer = bm.loops.layers.uv.verify()
-        bm.faces.layers.tex.verify()
-        
-        # adjust UVs
-        for f in bm.faces:
-            for l in f.loops:
-                luv = l[uv_layer]
-                luv.uv = uvs[l.vert.index]
-        
-        bm.to_mesh(mesh)
-        bm.free()      
-        
-        # set uv faces image
-        for uv_face in ob.data.uv_textures.active.data:
-            uv_face.image = img
-        
-        ob.data.materials.append(mat)
-        
-        return ob
-    
-    def read_cheetah_atlas(self, context, filepath):
-        atlasesHolder = None
-        
-        # place to some layer TODO: make parameter
-        activeLayer = 10
-        layersSet = [
-            False, False, False, False, False,    False, False, False, False, False, 
-            False, False, False, False, False,    False, False, False, False, False  ]
-        layersSet[activeLayer] = True
-        oldLayerState = bpy.context.scene.layers[activeLayer]
-        bpy.context.scene.layers[activeLayer] = True
-        
-        if "atlases" in bpy.data.objects:
-            atlasesHolder = bpy.data.objects["atlases"]
-        else:
-            bpy.ops.object.empty_add(type='PLAIN_AXES', radius=1, view_align=False, location=(0, 0, 0), layers=layersSet)
-            atlasesHolder = bpy.context.active_object
-            atlasesHolder.name = "atlases"
-
-        
-        # if atlas already exists, skip it
-        for atlas in atlasesHolder.children:
-            if atlas["path"] == filepath: return {'FINISHED'}
-        
-        atlasHolder = None
-        bpy.ops.object.empty_add(type='PLAIN_AXES', radius=1, view_align=False, location=(0, 0, 0), layers=layersSet)
-        atlasHolder = bpy.context.active_object
-        atlasHolder.parent = atlasesHolder
-        atlasHolder['path'] = filepath
-
-        try: 
-            atlasHolder.name = unix_slashes(os.path.relpath(filepath, bpy.context.scene.cheetah_relpath))
-        except:
-            atlasHolder.name = unix_slashevis(os.path.basename(filepath))
-        atlasHolder['name'] = atlasHolder.name
-        
-        f = open(filepath, 'r', encoding='utf-8')
-        data = f.read()
-        f.close()
-
-        img = bpy.data.images.load(filepath=filepath.replace(".atlas",".png"));
-        
-        mat = bpy.data.materials.new(atlasHolder.name)
-        mat.use_shadeless = True
-        mat.use_transparency = True
-
-        tex = bpy.data.textures.new(atlasHolder.name, type = 'IMAGE')
-        tex.image = img
-        
-        mtex = mat.texture_slots.add()
-        mtex.texture = tex
-        mtex.texture_coords = 'UV'
-        
-        prevOb = None
-        
-        for line in iter(data.splitlines()):
-            if line[:9] == "textures:": continue
-            frameData = line.split('\t')
-            fName   = frameData[0]
-            xPos    = int(float(frameData[1]))
-            yPos    = int(float(frameData[2]))
-            width   = int(float(frameData[3]))
-            height  = int(float(frameData[4]))
-            xOffset = int(float(frameData[5]))
-            yOffset = int(float(frameData[6]))
-            origW   = int(float(frameData[7]))
-            origH   = int(float(frameData[8]))
-            
-            unitPerPixel = 1 / bpy.context.scene.cheetah_pixel_per_unit 
-
-            imgW = img.size[0]
-            imgH = img.size[1]
-            
-            if len(frameData) == 9 or frameData[9] != 'r': # !rotated
-                verts = [Vector((xOffset, 0, origH - yOffset)) * unitPerPixel,
-                         Vector((xOffset + width, 0, origH - yOffset)) * unitPerPixel,
-                         Vector((xOffset + width, 0, origH - yOffset - height)) * unitPerPixel,
-                         Vector((xOffset, 0, origH - yOffset - height)) * unitPerPixel,
-                         Vector((0, 0, 0)) * unitPerPixel,
-                         Vector((origW, 0, origH)) * unitPerPixel]
-
-                uvs = [ Vector((float(xPos) / float(imgW), float(imgH - yPos) / float(imgH) )),
-                        Vector((float(xPos + width) / float(imgW), float(imgH - yPos) / float(imgH) )),
-                        Vector((float(xPos + width) / float(imgW), float(imgH - yPos - height) / float(imgH) )),
-                        Vector((float(xPos) / float(imgW), float(imgH - yPos - height) / float(imgH) ))]
-            else:
-                verts = [Vector((yOffset, 0, origH - xOffset)) * unitPerPixel,
-                         Vector((yOffset + height, 0, origH - xOffset)) * unitPerPixel,
-                         Vector((yOffset + height, 0, origH - xOffset - width)) * unitPerPixel,
-                         Vector((yOffset, 0, origH - xOffset - width)) * unitPerPixel,
-                         Vector((0, 0, 0)) * unitPerPixel,
-                         Vector((origW, 0, origH)) * unitPerPixel]
-
-                uvs = [ Vector((float(xPos + width) / float(imgW), float(imgH - yPos) / float(imgH) )),
-                        Vector((float(xPos + width) / float(imgW), float(imgH - yPos - height) / float(imgH) )),
-                        Vector((float(xPos) / float(imgW), float(imgH - yPos - height) / float(imgH) )),
-                        Vector((float(xPos) / float(imgW), float(imgH - yPos) / float(imgH) ))]
-                
-            ob = self.createMesh(fName, verts, uvs, img, mat, atlasHolder)
-            ob["name"] = fName
+    layout = EnumProperty(
+            name="Frame Layout",
+            description="How frame objects are placed",
+            items=frameLayoutItems,
+            default='STACK',
+            )
 
-            if prevOb: print(prevOb.location[2])
-            if prevOb: ob.location[2] = prevOb.bound_box[6][2] + prevOb.location[2]
-            ob.data.update()
-            prevOb = ob
+    columns = bpy.props.IntProperty(
+            name="Grid Columns",
+            description="Frames per grid row, 0 for a square grid",
+            default=0,
+            min=0,
+            )
 
-            ob.layers = layersSet
-        bpy.context.scene.update()
-        bpy.context.scene.layers[activeLayer] = oldLayerState
-        
+    def read_cheetah_atlas(self, context, filepath):
+        try: importAtlas(context, filepath, self.frameStorage, self.batched, self.layout, self.columns)
+        except (OSError, CheetahAtlas.AtlasParseError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
         return {'FINISHED'}
     
-        
-        
     def execute(self, context):
         return self.read_cheetah_atlas(context, self.filepath)
- 
-def setSpriteFrame(src, dst):
-    for vert in src.data.vertices:
-        dst.data.vertices[vert.index].co = vert.co
-        
-    sbm = bmesh.new()
-    dbm = bmesh.new()
-    sbm.from_mesh(src.data)
-    dbm.from_mesh(dst.data)
-    
-    suv_layer = sbm.loops.layers.uv.verify()
-    duv_layer = dbm.loops.layers.uv.verify()
-    dbm.faces.layers.tex.verify()
-    
-    # adjust UVs
-    for f in dbm.faces:
-        for l in f.loops:
-            luv = l[duv_layer]
-            luv.uv = sbm.faces[f.index].loops[l.index][suv_layer].uv
+
+# A frame swap copies 18 vertex and 8 UV floats into the sprite quad. The
+# buffers are resolved once per (frame id, anchor point) with the anchor
+# translation already applied and kept in frameData until the frame index
+# is invalidated. Frame bounds are stored at import, so the anchor
+# translation is a constant offset.
+
+def anchorOffset(bounds, anchor):
+    minX, minZ, maxX, maxZ = bounds
+    return (-(maxX - minX) * anchor[0] - minX, -(maxZ - minZ) * anchor[1] - minZ)
+
+def anchorVerts(verts, anchor, bounds):
+    translateX, translateZ = anchorOffset(bounds, anchor)
+    verts = list(verts)
+    for i in range(0, len(verts), 3):
+        verts[i] += translateX
+        verts[i + 2] += translateZ
+    return verts
+
+def getFrameData(id, anchor):
+    key = (id, anchor)
+    data = frameData.get(key)
+    if data is not None: return data
+    src = getFrameObjectById(id)
+    if src is not None:
+        verts = [0.0] * 18
+        uvs = [0.0] * 8
+        src.data.vertices.foreach_get('co', verts)
+        src.data.uv_layers.active.data.foreach_get('uv', uvs)
+        mat = src.data.materials[0]
+        bounds = src['bounds'].to_list() if 'bounds' in src else vertsBounds(verts)
+    else:
+        entry = getFrameTableEntry(id)
+        if entry is None: return None
+        table, index = entry
+        verts, uvs, mat = table.frameVerts(index), table.frameUvs(index), table.material
+        bounds = table.frameBounds(index)
+    if anchor: verts = anchorVerts(verts, anchor, bounds)
+    data = frameData[key] = (verts, uvs, mat, bounds)
+    return data
+
+def writeFrameMesh(mesh, verts, uvs, mat):
+    mesh.vertices.foreach_set('co', verts)
+    mesh.uv_layers.active.data.foreach_set('uv', uvs)
     
-    dbm.to_mesh(dst.data)
-    sbm.free()      
-    dbm.free()      
+    if len(mesh.materials) == 0: mesh.materials.append(mat)
+    elif mesh.materials[0] != mat: mesh.materials[0] = mat
     
-    mat = src.data.materials[0]
-    tex = mat.texture_slots[0].texture
-    img = tex.image
-    
-    if len(dst.data.materials) > 0: dst.data.materials[0] = mat
-    else: dst.data.materials.append(mat)
+    img = mat.texture_slots[0].texture.image
+    if img is None: img = getMaterialImage(mat)
+    for uv_face in mesh.uv_textures.active.data:
+        if uv_face.image != img: uv_face.image = img
+    mesh.update()
+
+def setSpriteFrameData(dst, id, verts, uvs, mat):
+    writeFrameMesh(dst.data, verts, uvs, mat)
+    dst['sprite'] = id
+
+def setSpriteFrame(src, dst):
+    setSpriteFrameById(dst, getFrameIdOfFrameObject(src))
+
+def setSpriteAnchorPoint(ob, anchor):
+    """Move a sprite to a new anchor point using the stored frame bounds"""
+    if ob.get('sharedMesh') and 'sprite' in ob:
+        mesh = getSharedMesh(ob['sprite'], tuple(anchor))
+        if mesh is not None:
+            ob.data = mesh
+            persistAnchorPoint(ob, anchor)
+            return
+    data = getFrameData(ob['sprite'], False) if 'sprite' in ob else None
+    if data is None:
+        setAnchorPoint(ob, anchor)
+        persistAnchorPoint(ob, anchor)
+        return
+    # the quad holds the frame vertices shifted by the old anchor offset
+    translateX, translateZ = anchorOffset(data[3], anchor)
+    old = getAnchorPointStored(ob)
+    if old:
+        oldX, oldZ = anchorOffset(data[3], old)
+        translateX -= oldX
+        translateZ -= oldZ
     
-    # set uv faces image
-    for uv_face in dst.data.uv_textures.active.data:
-        uv_face.image = img
-        
-    dst['sprite'] = src.parent['name']+'|'+src['name']
+    # a sprite quad has 6 vertices, a list beats allocating an array
+    vertices = ob.data.vertices
+    co = [0.0] * (len(vertices) * 3)
+    vertices.foreach_get('co', co)
+    for i in range(0, len(co), 3):
+        co[i] += translateX
+        co[i + 2] += translateZ
+    vertices.foreach_set('co', co)
+    ob.data.update()
+    persistAnchorPoint(ob, anchor)
 
 def setSpriteFrameById(ob, id):
-    parts = id.split('|')
-    dst = ob
-    src = None
-    for atlas in bpy.data.objects['atlases'].children:
-        if atlas['name'] == parts[0]: break
-    for src in atlas.children:
-        if src['name'] == parts[1]: break
-    setSpriteFrame(src, dst)
-    restoreAnchorPoint(dst)
+    if ob.get('sprite') == id: return
+    if ob.get('sharedMesh'):
+        mesh = getSharedMesh(id, getAnchorPointStored(ob))
+        if mesh is None: return
+        ob.data = mesh
+        ob['sprite'] = id
+        return
+    data = getFrameData(id, getAnchorPointStored(ob))
+    if data is None: return
+    setSpriteFrameData(ob, id, *data[:3])
+
+############ shared frame meshes
+# Sprites with the 'sharedMesh' flag do not own their mesh. They show one
+# mesh per (frame id, anchor point), created on first use and marked with
+# 'sharedFrame' and 'sharedAnchor', so a frame swap only assigns ob.data.
+# Unused shared meshes stay in the file until purged.
+
+def indexSharedMeshes():
+    global sharedMeshesIndexed
+    sharedMeshesIndexed = True
+    sharedMeshes.clear()
+    for mesh in bpy.data.meshes:
+        if 'sharedFrame' not in mesh: continue
+        anchor = tuple(mesh['sharedAnchor']) if len(mesh['sharedAnchor']) else False
+        sharedMeshes[(mesh['sharedFrame'], anchor)] = mesh
+
+def getSharedMesh(id, anchor):
+    key = (id, anchor)
+    mesh = sharedMeshes.get(key)
+    if mesh is not None:
+        try:
+            if mesh.name: return mesh
+        except ReferenceError: pass
+    if not sharedMeshesIndexed or mesh is not None:
+        indexSharedMeshes()
+        mesh = sharedMeshes.get(key)
+        if mesh is not None: return mesh
+    data = getFrameData(id, anchor)
+    if data is None: return None
+    verts, uvs, mat, bounds = data
+    if anchor: name = "%s@%g,%g" % (id, anchor[0], anchor[1])
+    else: name = id
+    mesh = newQuadMesh(name, verts, uvs)
+    writeFrameMesh(mesh, verts, uvs, mat)
+    mesh['sharedFrame'] = id
+    mesh['sharedAnchor'] = list(anchor) if anchor else []
+    sharedMeshes[key] = mesh
+    return mesh
+
+def refreshSharedMeshes(frameIds):
+    if not sharedMeshesIndexed: indexSharedMeshes()
+    count = 0
+    for (id, anchor), mesh in list(sharedMeshes.items()):
+        if id not in frameIds: continue
+        data = getFrameData(id, anchor)
+        if data is None: continue
+        writeFrameMesh(mesh, data[0], data[1], data[2])
+        count += 1
+    return count
+
+def setSpriteMeshMode(ob, shared):
+    """Switch a sprite between its own mesh and the shared frame meshes"""
+    if shared == bool(ob.get('sharedMesh')): return
+    if shared:
+        mesh = getSharedMesh(ob['sprite'], getAnchorPointStored(ob))
+        if mesh is None: return
+        old = ob.data
+        ob.data = mesh
+        ob['sharedMesh'] = True
+        if not old.users: bpy.data.meshes.remove(old)
+    else:
+        ob.data = ob.data.copy()
+        for key in ('sharedFrame', 'sharedAnchor'): del ob.data[key]
+        del ob['sharedMesh']
+
+def purgeSharedMeshes():
+    """Remove the shared meshes no sprite shows, returns how many"""
+    indexSharedMeshes()
+    count = 0
+    for key, mesh in list(sharedMeshes.items()):
+        if mesh.users: continue
+        del sharedMeshes[key]
+        bpy.data.meshes.remove(mesh)
+        count += 1
+    return count
+
+class CheetahSpriteMeshMode(Operator):
+    """Let the selected sprites share one mesh per frame, or give them their own mesh again"""
+    bl_idname = "cheetah.sprite_mesh_mode"
+    bl_label = "Sprite Mesh Mode"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    shared = bpy.props.BoolProperty(name="Shared Frame Meshes", default=True)
+
+    def execute(self, context):
+        for ob in context.selected_objects:
+            if ob.type == 'MESH' and 'sprite' in ob: setSpriteMeshMode(ob, self.shared)
+        return {'FINISHED'}
+
+class CheetahPurgeFrameMeshes(Operator):
+    """Remove shared frame meshes that no sprite uses"""
+    bl_idname = "cheetah.purge_frame_meshes"
+    bl_label = "Purge Unused Frame Meshes"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        self.report({'INFO'}, "%d frame meshes removed" % purgeSharedMeshes())
+        return {'FINISHED'}
+
+############ enum items
+# Item lists for the atlas/frame pickers are built from the frame index and
+# only rebuilt when itemsVersion changes (import, atlas update, index
+# rebuild, undo, file load). The lists live at module level so Blender
+# never sees the strings of a dynamic enum freed under it.
+
+itemsVersion = 0
+itemsBuiltVersion = -1
+atlasItems = []
+frameItems = {} # atlas name -> items
+frameNamesSorted = {} # atlas name -> sorted frame names, for prefix search
+filteredFrameItems = {} # (atlas name, prefix) -> items
+allFrameItems = [] # "atlas|frame" items for the search popup
+itemAtlases = [] # atlas empties the items were built from, checked for deletion
+
+def bumpItemsVersion():
+    global itemsVersion
+    itemsVersion += 1
+
+def rebuildItems():
+    global itemsBuiltVersion
+    if not frameIndexBuilt: rebuildFrameCache()
+    itemsBuiltVersion = itemsVersion
+    names = {}
+    for id in cache:
+        atlasName, frameName = id.split('|', 1)
+        names.setdefault(atlasName, []).append(frameName)
+    for atlasName, table in frameTables.items():
+        # an atlas with stubbed frames has both frame objects and a table
+        names.setdefault(atlasName, []).extend(table.names)
+    del atlasItems[:]
+    frameItems.clear()
+    frameNamesSorted.clear()
+    filteredFrameItems.clear()
+    del allFrameItems[:]
+    del itemAtlases[:]
+    if 'atlases' in bpy.data.objects: itemAtlases.extend(bpy.data.objects['atlases'].children)
+    for atlasName in sorted(names):
+        atlasItems.append((atlasName, atlasName, ""))
+        frameItems[atlasName] = [(name, name, "") for name in names[atlasName]]
+        frameNamesSorted[atlasName] = sorted(names[atlasName])
+        for name in names[atlasName]:
+            id = atlasName + '|' + name
+            allFrameItems.append((id, id, ""))
+
+def atlasDeleted():
+    for atlas in itemAtlases:
+        try:
+            if not atlas.users or atlas.parent is None: return True
+        except ReferenceError: return True
+    return False
+
+def ensureItems():
+    global frameIndexBuilt
+    # deleting an atlas bumps nothing, its frames lost their parent as well
+    if itemsBuiltVersion == itemsVersion and atlasDeleted():
+        frameIndexBuilt = False
+        bumpItemsVersion()
+    if itemsBuiltVersion != itemsVersion: rebuildItems()
+
+def findFrameNames(atlasName, prefix):
+    """Frame names of an atlas starting with prefix, by bisecting the sorted names"""
+    ensureItems()
+    names = frameNamesSorted.get(atlasName, [])
+    start = bisect.bisect_left(names, prefix)
+    end = bisect.bisect_left(names, prefix + '\uffff')
+    return names[start:end]
 
 def getAtlasItems(self, context):
-    items = []
-    for atlas in bpy.data.objects['atlases'].children:
-        items.append((atlas['name'],atlas['name'], ""))
-    return items
+    ensureItems()
+    return atlasItems
+
 def getFrameItems(self, context):
-    items = []
-    atlas = None
-    for atlas in bpy.data.objects['atlases'].children:
-        if atlas['name'] == self.atlasName: break
-    for frame in atlas.children:
-        items.append((frame['name'],frame['name'], ""))
+    ensureItems()
+    prefix = getattr(self, 'framePrefix', '')
+    if not prefix: return frameItems.get(self.atlasName, [])
+    key = (self.atlasName, prefix)
+    items = filteredFrameItems.get(key)
+    if items is None:
+        items = filteredFrameItems[key] = [(name, name, "") for name in findFrameNames(self.atlasName, prefix)]
     return items
 
+def getAllFrameItems(self, context):
+    ensureItems()
+    return allFrameItems
+
 def getDefaultAtlas(self, context):
     print("susanna")
     return ""
 
 def getFrameIdOfFrameObject(ob):
     return ob.parent['name'] + '|' + ob['name']
+
+############ frame registry
+# cache maps "atlas|frame" ids to frame objects. Object references go stale
+# after undo/redo and file load, so those handlers drop the whole index and
+# every hit is validated before use; the index is rebuilt in a single pass
+# on the first lookup after invalidation or when a hit turned out stale.
+
+def rebuildFrameCache():
+    global frameIndexBuilt
+    frameIndexBuilt = True
+    bumpItemsVersion()
+    patternSequences.clear()
+    cache.clear()
+    frameTables.clear()
+    frameData.clear()
+    if 'atlases' not in bpy.data.objects: return
+    atlases = bpy.data.objects['atlases']
+    for ob in bpy.data.objects:
+        atlas = ob.parent
+        if atlas is None or 'name' not in ob or not ob.users: continue
+        if atlas == atlases:
+            if 'frameNames' in ob: frameTables[ob['name']] = FrameTable(ob)
+        elif atlas.parent == atlases:
+            cache[getFrameIdOfFrameObject(ob)] = ob
+
+def getFrameObjectById(id):
+    ob = cache.get(id)
+    if ob is not None:
+        try:
+            if ob.users and ob.parent and getFrameIdOfFrameObject(ob) == id: return ob
+        except ReferenceError: pass
+    elif frameIndexBuilt: return None
+    rebuildFrameCache()
+    return cache.get(id)
+
+def getFrameTableEntry(id):
+    atlasName, frameName = id.split('|', 1)
+    table = frameTables.get(atlasName)
+    if table is not None:
+        try:
+            if table.atlas.users: return table.find(frameName)
+        except ReferenceError: pass
+    elif frameIndexBuilt: return None
+    rebuildFrameCache()
+    table = frameTables.get(atlasName)
+    if table is None: return None
+    return table.find(frameName)
+
+@persistent
+def invalidateFrameCache(*args):
+    global frameIndexBuilt, sharedMeshesIndexed
+    frameIndexBuilt = False
+    sharedMeshesIndexed = False
+    sharedMeshes.clear()
+    bumpItemsVersion()
+    patternSequences.clear()
+    cache.clear()
+    frameTables.clear()
+    frameData.clear()
+    images.clear()
+    materials.clear()
     
+class CheetahImportAtlasDirectory(Operator):
+    """Import every .atlas file of a directory"""
+    bl_idname = "cheetah.atlas_import_directory"
+    bl_label = "Import Cheetah Atlas Directory"
+
+    directory = StringProperty(subtype='DIR_PATH')
+    filter_folder = BoolProperty(default=True, options={'HIDDEN'})
+    pattern = StringProperty(name="Pattern", default="*.atlas")
+    recursive = BoolProperty(name="Recursive", default=False)
+    processes = BoolProperty(
+            name="Parse In Processes",
+            description="Parse in a process pool instead of a thread pool",
+            default=False,
+            )
+    frameStorage = EnumProperty(
+            name="Frame Storage",
+            description="How imported frames are stored",
+            items=frameStorageItems,
+            default='OBJECTS',
+            )
+    layout = EnumProperty(
+            name="Frame Layout",
+            description="How frame objects are placed",
+            items=frameLayoutItems,
+            default='STACK',
+            )
+    columns = bpy.props.IntProperty(name="Grid Columns", description="Frames per grid row, 0 for a square grid", default=0, min=0)
+
+    def execute(self, context):
+        timings, total = importAtlasDirectory(context, self.directory, self.pattern, self.recursive, self.processes,
+                                              self.frameStorage, layout=self.layout, columns=self.columns)
+        printImportTimings(timings, total)
+        failed = sum(1 for path, result in timings if isinstance(result, Exception))
+        if failed: self.report({'WARNING'}, "%d of %d atlases failed, see console" % (failed, len(timings)))
+        else: self.report({'INFO'}, "%d atlases imported in %.2f s" % (len(timings), total))
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+def findAtlas(name):
+    if 'atlases' not in bpy.data.objects: return None
+    for atlas in bpy.data.objects['atlases'].children:
+        if atlas['name'] == name: return atlas
+    return None
+
+def findAtlasMaterial(atlas):
+    """Material of an atlas; atlases imported before 'material' was stored use their frames' material"""
+    name = atlas.get('material')
+    if name in bpy.data.materials: return bpy.data.materials[name]
+    for ob in bpy.data.objects:
+        if ob.parent == atlas and ob.type == 'MESH' and ob.data.materials and ob.data.materials[0] is not None:
+            mat = ob.data.materials[0]
+            break
+    else: mat = getAtlasMaterial(atlas['path'].replace(".atlas",".png"))
+    atlas['material'] = mat.name
+    return mat
+
+def refreshSprites(frameIds):
+    """Rewrite every sprite showing one of frameIds, in one pass"""
+    frameData.clear()
+    count = refreshSharedMeshes(frameIds)
+    for ob in bpy.data.objects:
+        id = ob.get('sprite')
+        if id not in frameIds or ob.get('sharedMesh'): continue
+        data = getFrameData(id, getAnchorPointStored(ob))
+        if data is None: continue
+        setSpriteFrameData(ob, id, *data[:3])
+        count += 1
+    return count
+
+class CheetahReimportAtlas(Operator):
+    """Update an imported atlas from its .atlas file, rewriting only changed frames"""
+    bl_idname = "cheetah.atlas_reimport"
+    bl_label = "Update Cheetah Atlas"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    atlasName = bpy.props.EnumProperty(
+          items=getAtlasItems,
+          name="Atlas Name", description="One of the imported atlases")
+
+    def execute(self, context):
+        atlas = findAtlas(self.atlasName)
+        if atlas is None: return {'CANCELLED'}
+        try: parsed = CheetahAtlas.parseAtlas(atlas['path'])
+        except (OSError, CheetahAtlas.AtlasParseError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        
+        mat = findAtlasMaterial(atlas)
+        img = mat.texture_slots[0].texture.image
+        if img is not None:
+            img.reload()
+            # rewrites an outdated proxy
+            switchAtlasImages(context.scene)
+        try: imgW, imgH = imageSize(mat.get('cheetahImage') or atlas['path'].replace(".atlas",".png"))
+        except OSError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        if atlas.get('frameStubs'): restoreFrameStubs(atlas)
+        unitPerPixel = 1 / context.scene.cheetah_pixel_per_unit
+        # UVs are normalized by the sheet size, so a resized sheet touches every frame
+        rewriteAll = list(atlas.get('imageSize', ())) != [imgW, imgH] or atlas.get('unitPerPixel') != unitPerPixel
+        atlas['imageSize'] = [imgW, imgH]
+        atlas['unitPerPixel'] = unitPerPixel
+        
+        if 'frameNames' in atlas:
+            changed, added, removed = self.updateTable(atlas, parsed.frames, unitPerPixel, imgW, imgH, rewriteAll)
+        else:
+            changed, added, removed = self.updateObjects(context, atlas, parsed.frames, unitPerPixel, imgW, imgH, img, mat, rewriteAll)
+        
+        bumpItemsVersion()
+        patternSequences.clear()
+        prefix = atlas['name'] + '|'
+        sprites = refreshSprites(set(prefix + name for name in changed))
+        self.report({'INFO'}, "%d frames updated, %d added, %d removed, %d sprites refreshed" % (len(changed), added, removed, sprites))
+        return {'FINISHED'}
+
+    def updateTable(self, atlas, frames, unitPerPixel, imgW, imgH, rewriteAll):
+        oldNames = atlas['frameNames'].split('\n')
+        oldRects = atlas['frameRects'].to_list() if 'frameRects' in atlas else []
+        old = {}
+        for i, name in enumerate(oldNames):
+            old[name] = oldRects[i * 9:i * 9 + 9]
+        changed = []
+        added = 0
+        for frame in frames:
+            rect = old.pop(frame.name, None)
+            if rect is None: added += 1
+            elif rewriteAll or rect != frameRect(frame): changed.append(frame.name)
+        storeFrameTable(atlas, frames, unitPerPixel, imgW, imgH)
+        frameTables[atlas['name']] = FrameTable(atlas)
+        return changed, added, len(old)
+
+    def updateObjects(self, context, atlas, frames, unitPerPixel, imgW, imgH, img, mat, rewriteAll):
+        existing = {}
+        top = 0.0
+        for ob in bpy.data.objects:
+            if ob.parent == atlas and 'name' in ob:
+                existing[ob['name']] = ob
+                if 'rect' in ob: height = ob['rect'][7] * unitPerPixel
+                else: height = ob.dimensions[2]
+                top = max(top, ob.location[2] + height)
+        
+        changed = []
+        newFrames = []
+        for frame in frames:
+            ob = existing.pop(frame.name, None)
+            if ob is None:
+                newFrames.append(frame)
+                continue
+            if 'removed' in ob: del ob['removed']
+            rect = frameRect(frame)
+            if not rewriteAll and 'rect' in ob and list(ob['rect']) == rect: continue
+            updateFrameMesh(ob.data, frame, unitPerPixel, imgW, imgH)
+            ob['rect'] = rect
+            ob['bounds'] = frameBounds(frame, unitPerPixel)
+            changed.append(frame.name)
+        
+        for ob in existing.values(): ob['removed'] = True
+        
+        layers = [layer == 10 for layer in range(20)]
+        for frame, ob in zip(newFrames, createFrameMeshes(newFrames, unitPerPixel, imgW, imgH, img, mat, atlas, layers)):
+            ob['name'] = frame.name
+            ob['rect'] = frameRect(frame)
+            ob['bounds'] = frameBounds(frame, unitPerPixel)
+            ob.location[2] = top
+            top += frame.origH * unitPerPixel
+            cache[atlas['name'] + '|' + frame.name] = ob
+        return changed, len(newFrames), len(existing)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+ 
+import CheetahPacker
+
+class CheetahPackAtlas(Operator):
+    """Trim and pack a folder of PNG frames into an .atlas and sheet, then import or update it"""
+    bl_idname = "cheetah.atlas_pack"
+    bl_label = "Pack Atlas From Folder"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    directory = StringProperty(subtype='DIR_PATH')
+    filter_folder = BoolProperty(default=True, options={'HIDDEN'})
+    atlasPath = StringProperty(
+            name="Atlas File",
+            description="Output .atlas file, next to the folder when empty",
+            subtype='FILE_PATH',
+            )
+    maxSize = bpy.props.IntProperty(name="Max Sheet Size", default=4096, min=64)
+    padding = bpy.props.IntProperty(name="Padding", default=2, min=0)
+    allowRotation = BoolProperty(name="Allow Rotation", default=True)
+    processes = BoolProperty(
+            name="Trim In Processes",
+            description="Decode and trim changed images in a process pool",
+            default=True,
+            )
+    force = BoolProperty(name="Force Repack", description="Repack even if no image changed", default=False)
+
+    def execute(self, context):
+        folder = os.path.normpath(bpy.path.abspath(self.directory))
+        atlasPath = bpy.path.abspath(self.atlasPath) if self.atlasPath else folder + '.atlas'
+        if self.processes: multiprocessing.set_executable(bpy.app.binary_path_python)
+        try:
+            result = CheetahPacker.packFolder(folder, atlasPath, self.maxSize, self.padding, self.allowRotation,
+                                              None if self.processes else 0, self.force)
+        except (OSError, CheetahPacker.PackError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        
+        atlas = None
+        for ob in bpy.data.objects:
+            if ob.parent is not None and ob.parent.name == 'atlases' and os.path.abspath(ob.get('path', '')) == os.path.abspath(atlasPath):
+                atlas = ob
+                break
+        try:
+            if atlas is None: importAtlas(context, atlasPath)
+            elif not result.skipped: bpy.ops.cheetah.atlas_reimport(atlasName=atlas['name'])
+        except (OSError, CheetahAtlas.AtlasParseError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.report({'INFO'}, str(result))
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
 class CheetahSetSpriteFrame(Operator):
     """Set Frame To Sprite"""
     bl_idname = "cheetah.set_sprite_frame"  # important since its how bpy.ops.import_test.some_data is constructed
@@ -375,19 +1408,15 @@ class CheetahSetSpriteFrame(Operator):
           name="Atlas Name", description="One of the imported atlases")
 
 
+    framePrefix = bpy.props.StringProperty(
+          name="Frame Filter", description="Only list frames starting with this text")
+
     frameName = bpy.props.EnumProperty(
           items=getFrameItems, 
           name="Frame Name", description="One of the selected atlas frame")
 
     def execute(self, context):
-        dst = context.active_object
-        src = None
-        for atlas in bpy.data.objects['atlases'].children:
-            if atlas['name'] == self.atlasName: break
-        for src in atlas.children:
-            if src['name'] == self.frameName: break
-        setSpriteFrame(src, dst)
-        restoreAnchorPoint(dst)
+        setSpriteFrameById(context.active_object, self.atlasName + '|' + self.frameName)
         return {'FINISHED'}
 
     def invoke(self, context, event):
@@ -395,6 +1424,23 @@ class CheetahSetSpriteFrame(Operator):
         atlasName = parts[0]
         frameName = parts[1]
         return self.execute(context)
+
+class CheetahSearchSpriteFrame(Operator):
+    """Search all imported frames and set the picked one to the active sprite"""
+    bl_idname = "cheetah.search_sprite_frame"
+    bl_label = "Search Sprite Frame"
+    bl_options = {'REGISTER', 'UNDO'}
+    bl_property = "frameId"
+
+    frameId = bpy.props.EnumProperty(items=getAllFrameItems, name="Frame")
+
+    def execute(self, context):
+        setSpriteFrameById(context.active_object, self.frameId)
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        context.window_manager.invoke_search_popup(self)
+        return {'RUNNING_MODAL'}
     
 class CheetahAddSpriteOperator(Operator):
     """Add a new cheetah sprite object"""
@@ -406,6 +1452,9 @@ class CheetahAddSpriteOperator(Operator):
           items=getAtlasItems, 
           name="Atlas Name", description="One of the imported atlases")
 
+    framePrefix = bpy.props.StringProperty(
+          name="Frame Filter", description="Only list frames starting with this text")
+
     frameName = bpy.props.EnumProperty(
           items=getFrameItems, 
           name="Frame Name", description="One of the selected atlas frame")
@@ -413,65 +1462,127 @@ class CheetahAddSpriteOperator(Operator):
     anchorPoint = bpy.props.FloatVectorProperty(size=2, default=(0.5,0.5))
     
     def execute(self, context):
-        edges = []
-        faces = [[0, 1, 2, 3]]
-        name = "sprite"
-        verts = []
         parent = context.active_object
         if parent and not parent.select: parent = None
-        
-        for i in range(0,6): verts.append(Vector((0,0,0)))
-        
-        mesh = bpy.data.meshes.new(name=name)
-        mesh.from_pydata(verts, edges, faces)
-        
-        ob = bpy.data.objects.new(name, mesh)
-        scn = bpy.context.scene
+        id = self.atlasName + '|' + self.frameName
+        if getFrameData(id, False) is None:
+            self.report({'ERROR'}, "Unknown frame %s" % id)
+            return {'CANCELLED'}
+        createSprites(context, [(id, context.space_data.cursor_location, self.anchorPoint)], parent)
+        return {'FINISHED'}
+
+############ bulk sprites
+
+def splitUnresolved(entries):
+    """(entries whose frame id resolves, frame ids that do not)"""
+    resolved = []
+    missing = []
+    for entry in entries:
+        if getFrameData(entry[0], False) is None: missing.append(entry[0])
+        else: resolved.append(entry)
+    return resolved, missing
+
+def createSprites(context, entries, parent=None, shared=False):
+    """Create one sprite per (frame id, location, anchor point) entry.
+
+    Locations are in world space. Entries whose frame id does not resolve
+    are skipped. All sprites start as copies of one preallocated quad mesh,
+    or on the shared frame mesh when shared is set, and the selection is
+    updated once at the end."""
+    entries = splitUnresolved(entries)[0]
+    scn = context.scene
+    template = newQuadMesh("sprite", [0.0] * 18, [0.0] * 8)
+    parentInverse = parent.matrix_world.inverted() if parent else None
+    sprites = []
+    for id, location, anchor in entries:
+        mesh = getSharedMesh(id, (anchor[0], anchor[1])) if shared else None
+        ob = bpy.data.objects.new("sprite", template.copy() if mesh is None else mesh)
         scn.objects.link(ob)
-        scn.objects.active = ob
-        
         ob.parent = parent #todo: add is mesh assert for parent
-        targetLocation = context.space_data.cursor_location
-        if parent: 
-            targetLocation = parent.matrix_world.inverted() * targetLocation
-        ob.location = targetLocation
+        location = Vector(location)
+        if parent: location = parentInverse * location
+        ob.location = location
         ob.lock_location[1] = True
         ob.lock_rotation[0] = ob.lock_rotation[2] = True
-        
-        mesh.update()
-        bm = bmesh.new()
-        bm.from_mesh(mesh)
-        
-        uv_layer = bm.loops.layers.uv.verify()
-        bm.faces.layers.tex.verify()
-        
-        # adjust UVs
-        for f in bm.faces:
-            for l in f.loops:
-                luv = l[uv_layer]
-                luv.uv = Vector((0,0))
-        
-        bm.to_mesh(mesh)
-        bm.free()      
-        
-        # copypaste from setframe operator
-        dst = ob
-        src = None
-        for atlas in bpy.data.objects['atlases'].children:
-            if atlas['name'] == self.atlasName: break
-        for src in atlas.children:
-            if src['name'] == self.frameName: break
-        setSpriteFrame(src, dst)
-        
-        # set anchor point
-        setAnchorPoint(ob, self.anchorPoint)
-        persistAnchorPoint(ob, self.anchorPoint)
-        
-        #select only object
-        bpy.ops.object.select_all(action='DESELECT')
-        ob.select = True
-        context.scene.objects.active = ob
+        # the stored anchor point is applied together with the frame
+        persistAnchorPoint(ob, anchor)
+        if mesh is not None: ob['sharedMesh'] = True
+        setSpriteFrameById(ob, id)
+        sprites.append(ob)
+    bpy.data.meshes.remove(template)
+    
+    #select only the new sprites
+    for ob in context.selected_objects: ob.select = False
+    for ob in sprites: ob.select = True
+    if sprites: scn.objects.active = sprites[-1]
+    return sprites
+
+def readSpriteLayout(filepath):
+    """Read (frame id, location, anchor point) entries from a .json or .csv layout.
+
+    JSON: a list of {"frame": "atlas|frame", "location": [x, y, z], "anchor": [x, y]}
+    CSV: frame,x,y,z[,anchorX,anchorY] per row"""
+    entries = []
+    if filepath.lower().endswith('.json'):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for item in json.load(f):
+                entries.append((item['frame'], tuple(item['location']), tuple(item.get('anchor', (0.5, 0.5)))))
+        return entries
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith('#'): continue
+            anchor = (float(row[4]), float(row[5])) if len(row) > 5 else (0.5, 0.5)
+            entries.append((row[0], (float(row[1]), float(row[2]), float(row[3])), anchor))
+    return entries
+
+def gridLayout(frameIds, origin, columns, spacing):
+    """Entries placing frameIds row by row on the XZ plane, starting at origin"""
+    entries = []
+    for i, id in enumerate(frameIds):
+        location = (origin[0] + (i % columns) * spacing[0], origin[1], origin[2] - (i // columns) * spacing[1])
+        entries.append((id, location, (0.5, 0.5)))
+    return entries
+
+class CheetahAddSpritesOperator(Operator):
+    """Add many cheetah sprites from a layout file or as a grid of frames"""
+    bl_idname = "cheetah.add_sprites"
+    bl_label = "Cheetah Sprites"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    source = bpy.props.EnumProperty(
+          items=(('GRID', "Grid", "All frames of an atlas matching the filter, placed on a grid at the cursor"),
+                 ('FILE', "Layout File", "Frame ids, locations and anchor points from a .json or .csv file")),
+          name="Source", default='GRID')
+    filepath = bpy.props.StringProperty(name="Layout File", subtype='FILE_PATH')
+    atlasName = bpy.props.EnumProperty(
+          items=getAtlasItems,
+          name="Atlas Name", description="One of the imported atlases")
+    framePrefix = bpy.props.StringProperty(
+          name="Frame Filter", description="Only place frames starting with this text")
+    columns = bpy.props.IntProperty(name="Columns", default=10, min=1)
+    spacing = bpy.props.FloatVectorProperty(name="Spacing", size=2, default=(1.0, 1.0))
+    shared = bpy.props.BoolProperty(
+          name="Shared Frame Meshes", description="Sprites share one mesh per frame instead of owning a copy",
+          default=False)
+
+    def execute(self, context):
+        if self.source == 'FILE':
+            try: entries = readSpriteLayout(bpy.path.abspath(self.filepath))
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                self.report({'ERROR'}, "Cannot read layout: %s" % e)
+                return {'CANCELLED'}
+        else:
+            ids = [self.atlasName + '|' + name for name in findFrameNames(self.atlasName, self.framePrefix)]
+            entries = gridLayout(ids, context.scene.cursor_location, self.columns, self.spacing)
+        entries, missing = splitUnresolved(entries)
+        for id in missing: print("unknown frame %s" % id)
+        sprites = createSprites(context, entries, shared=self.shared)
+        if missing: self.report({'WARNING'}, "%d sprites added, %d unknown frames skipped, see console" % (len(sprites), len(missing)))
+        else: self.report({'INFO'}, "%d sprites added" % len(sprites))
         return {'FINISHED'}
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
                  
 class AddSingleFrameDriverOperator(Operator):
     """Add single frame driver"""
@@ -483,6 +1594,9 @@ class AddSingleFrameDriverOperator(Operator):
           items=getAtlasItems,
           name="Atlas Name", description="One of the imported atlases")
 
+    framePrefix = bpy.props.StringProperty(
+          name="Frame Filter", description="Only list frames starting with this text")
+
     frameName = bpy.props.EnumProperty(
           items=getFrameItems,
           name="Frame Name", description="One of the selected atlas frame")
@@ -508,8 +1622,7 @@ class AddSingleFrameDriverOperator(Operator):
         empty['frame'] = frameId
         empty['enabled'] = False
         empty.parent = sprite
-        
-        
+        registerDriver(empty)
         
         return {'FINISHED'}
 
@@ -519,67 +1632,885 @@ class AddSingleFrameDriverOperator(Operator):
         col = layout.column()
         if len(context.selected_objects) == 1:
             col.prop(self, "atlasName")
+            col.prop(self, "framePrefix")
             col.prop(self, "frameName")
 
+############ click animation
+# A click moves a driver to z 1.5 on the hit frame, 0 on the frames next to
+# it and 3 two frames away, all with constant interpolation. Keys of
+# overlapping hits are merged by priority (hit frame over neighbours over
+# outer frames), also against click keys already on the z fcurve; other
+# existing keys on a click frame are replaced. New points go onto the
+# existing location fcurves in one keyframe_points.add + foreach_set
+# instead of going through keyframe_insert for each key.
+
+clickKeys = ((0, 1.5, 2), (-1, 0.0, 1), (1, 0.0, 1), (-2, 3.0, 0), (2, 3.0, 0)) # offset, z, priority
+clickPriorities = dict((z, priority) for offset, z, priority in clickKeys)
+
+def mergeClickHits(frames):
+    """{frame: z} for click hits on frames"""
+    keys = {}
+    for frame in frames:
+        for offset, z, priority in clickKeys:
+            old = keys.get(frame + offset)
+            if old is None or priority > old[1]: keys[frame + offset] = (z, priority)
+    return dict((frame, key[0]) for frame, key in keys.items())
+
+def keyframeCo(fcurve):
+    co = [0.0] * (len(fcurve.keyframe_points) * 2)
+    fcurve.keyframe_points.foreach_get('co', co)
+    return co
+
+def writeLocationKeys(ob, keys):
+    """Merge {frame: z} into the location fcurves of ob, x and y keyed at 0"""
+    if ob.animation_data is None: ob.animation_data_create()
+    action = ob.animation_data.action
+    if action is None: action = ob.animation_data.action = bpy.data.actions.new(ob.name + "Action")
+    fcurves = []
+    for index in range(3):
+        fcurve = action.fcurves.find('location', index=index)
+        if fcurve is None: fcurve = action.fcurves.new('location', index=index, action_group="Object Transforms")
+        fcurves.append(fcurve)
+    
+    co = keyframeCo(fcurves[2])
+    existing = dict(zip(co[0::2], co[1::2]))
+    merged = {}
+    for frame, z in keys.items():
+        frame = float(frame)
+        old = existing.get(frame)
+        if old is None or clickPriorities.get(old, -1) <= clickPriorities[z]: merged[frame] = z
+    
+    for index, fcurve in enumerate(fcurves):
+        co = keyframeCo(fcurve)
+        positions = dict((frame, i) for i, frame in enumerate(co[0::2]))
+        added = [frame for frame in sorted(merged) if frame not in positions]
+        for frame in added:
+            positions[frame] = len(co) // 2
+            co += (frame, 0.0)
+        written = []
+        for frame, z in merged.items():
+            i = positions[frame]
+            co[i * 2 + 1] = z if index == 2 else 0.0
+            written.append(i)
+        points = fcurve.keyframe_points
+        points.add(len(added))
+        points.foreach_set('co', co)
+        for i in written: points[i].interpolation = 'CONSTANT'
+        fcurve.extrapolation = 'CONSTANT'
+        fcurve.update()
+
+def addClickAnimation(hits):
+    """Key click animations for (driver, frame) hits"""
+    frames = {}
+    for ob, frame in hits: frames.setdefault(ob, []).append(frame)
+    for ob, obFrames in frames.items(): writeLocationKeys(ob, mergeClickHits(obFrames))
+
 class AddClickAnimationOperator(Operator):
-    """Add click keyframes for object, such as singleFrameDriver"""
+    """Add click keyframes at the current frame for the selected drivers, such as singleFrameDrivers"""
     bl_idname = "cheetah.add_click_animation" 
     bl_label = "Add Click Animation"
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        driver = context.active_object        
         cf = context.scene.frame_current
-        
-        driver.location = 0.0, 0.0, 1.5
-        driver.keyframe_insert(data_path='location', frame=(cf))
-
-        driver.location = 0.0, 0.0, 0.0
-        driver.keyframe_insert(data_path='location', frame=(cf-1))
-        driver.keyframe_insert(data_path='location', frame=(cf+1))
-        
-        for fcurve in driver.animation_data.action.fcurves:
-            if fcurve.data_path == 'location':
-                fcurve.extrapolation = 'CONSTANT'
-                for keyframe in fcurve.keyframe_points:
-                    keyframe.interpolation = 'CONSTANT'
-        
-        driver.location = 0.0, 0.0, 3.0
-        driver.keyframe_insert(data_path='location', frame=(cf-2))
-        driver.keyframe_insert(data_path='location', frame=(cf+2))
-                
-        
+        objects = list(context.selected_objects)
+        if context.active_object is not None and context.active_object not in objects: objects.append(context.active_object)
+        driverObs = [ob for ob in objects if 'driver' in ob]
+        if not driverObs:
+            self.report({'ERROR'}, "No driver selected")
+            return {'CANCELLED'}
+        addClickAnimation([(ob, cf) for ob in driverObs])
         return {'FINISHED'}
 
 
   
 def menu_func(self, context):
-    if context.mode == 'OBJECT': self.layout.operator(CheetahAddSpriteOperator.bl_idname, icon='UV_FACESEL')
+    if context.mode == 'OBJECT': 
+        self.layout.operator(CheetahAddSpriteOperator.bl_idname, icon='UV_FACESEL')
+        self.layout.operator(CheetahAddSpritesOperator.bl_idname, icon='UV_FACESEL')
 
 from math import *
 
 ############ animation
+# Frame drivers are tracked in the drivers registry so the frame handler does
+# not scan bpy.data.objects. It is rebuilt on file load and undo/redo, when
+# object pointers change, and by the handler whenever the object count
+# changed, which catches drivers that were duplicated, appended or linked;
+# deleted drivers are dropped lazily by the handler.
+
+driversObjectCount = -1 # len(bpy.data.objects) at the last rebuild
+
+def registerDriver(ob):
+    drivers[ob] = None
+
+def rebuildDriverRegistry():
+    global driversObjectCount
+    driversObjectCount = len(bpy.data.objects)
+    drivers.clear()
+    patternSequences.clear()
+    bakedTables.clear()
+    for ob in bpy.data.objects:
+        if 'driver' in ob and ob.users: drivers[ob] = None
+
+@persistent
+def rebuildDriverRegistryHandler(*args):
+    rebuildDriverRegistry()
+
+class RefreshDriversOperator(Operator):
+    """Rescan the scene for frame drivers, e.g. after adding one by hand"""
+    bl_idname = "cheetah.refresh_drivers"
+    bl_label = "Refresh Frame Drivers"
+
+    def execute(self, context):
+        rebuildDriverRegistry()
+        self.report({'INFO'}, "%d frame drivers" % len(drivers))
+        return {'FINISHED'}
+
+# Pattern drivers show framePattern % round(step * frameIncrement + startFrame)
+# for step = floor(location.z - 1). The ids are formatted once per driver,
+# up to the first one that does not resolve, and recompiled when one of
+# the three properties changes.
+
+maxPatternLength = 100000
+
+def compilePatternSequence(ob):
+    key = (ob['framePattern'], ob['startFrame'], ob['frameIncrement'])
+    pattern, startFrame, frameIncrement = key
+    ids = []
+    while len(ids) < maxPatternLength:
+        id = pattern % round(len(ids) * frameIncrement + startFrame)
+        if getFrameObjectById(id) is None and getFrameTableEntry(id) is None: break
+        ids.append(id)
+    patternSequences[ob] = (key, ids)
+    return ids
+
+def getPatternSequence(ob):
+    compiled = patternSequences.get(ob)
+    if compiled is None or compiled[0] != (ob['framePattern'], ob['startFrame'], ob['frameIncrement']):
+        return compilePatternSequence(ob)
+    return compiled[1]
+
+class AddPatternDriverOperator(Operator):
+    """Add a driver that plays a numbered frame sequence on the selected sprite"""
+    bl_idname = "cheetah.add_pattern_driver"
+    bl_label = "Add Pattern Driver"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    framePattern = bpy.props.StringProperty(
+          name="Frame Pattern", description="Frame id with a %d style placeholder, e.g. atlas|walk_%04d")
+    startFrame = bpy.props.IntProperty(name="Start Frame", default=0)
+    frameIncrement = bpy.props.FloatProperty(name="Frame Increment", default=1.0)
+
+    def execute(self, context):
+        sprite = context.active_object
+        if sprite is None or 'sprite' not in sprite:
+            self.report({'ERROR'}, "Active object is not a sprite")
+            return {'CANCELLED'}
+        try: self.framePattern % self.startFrame
+        except (TypeError, ValueError):
+            self.report({'ERROR'}, "Frame pattern needs exactly one numeric placeholder")
+            return {'CANCELLED'}
+        
+        empty = bpy.data.objects.new("PatternDriver", None)
+        context.scene.objects.link(empty)
+        empty['driver'] = True
+        empty['framePattern'] = self.framePattern
+        empty['startFrame'] = self.startFrame
+        empty['frameIncrement'] = self.frameIncrement
+        empty['currentFrame'] = -1
+        empty.parent = sprite
+        registerDriver(empty)
+        
+        ids = compilePatternSequence(empty)
+        if not ids: self.report({'WARNING'}, "No frame matches %s" % (self.framePattern % self.startFrame))
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        # suggest the sprite's current frame with its trailing number as placeholder
+        sprite = context.active_object
+        if sprite is not None and 'sprite' in sprite:
+            match = re.match(r'(.*?)(\d+)$', sprite['sprite'])
+            if match:
+                self.framePattern = match.group(1).replace('%', '%%') + '%0' + str(len(match.group(2))) + 'd'
+                self.startFrame = int(match.group(2))
+        return context.window_manager.invoke_props_dialog(self)
+
+############ baking
+# A bake runs the driver logic over the scene frame range once and stores,
+# for every timeline frame, the frame index each driven sprite shows:
+#   cheetahBakeSprites  sprite object names, newline separated
+#   cheetahBakeFrames   frame ids, newline separated
+#   cheetahBakeRange    [first frame, last frame]
+#   cheetahBakeTable    (last - first + 1) rows of one frame index per sprite, -1 = untouched
+# Sprites start from the frame they show when the bake runs and drivers
+# start disabled. With a bake present the frame handler only applies the
+# row of the current frame, so frames can be rendered in any order or in
+# parallel processes.
+
+def driverZCurve(ob):
+    if ob.animation_data is None or ob.animation_data.action is None: return None
+    return ob.animation_data.action.fcurves.find('location', index=2)
+
+def evaluateFrameTable(scene):
+    """Run the frame drivers over the scene frame range, returns (sprites, frame ids, table)"""
+    rebuildDriverRegistry()
+    sprites = []
+    spriteIndex = {}
+    driven = []
+    for ob in drivers:
+        sprite = ob.parent
+        if sprite is None: continue
+        if sprite not in spriteIndex:
+            spriteIndex[sprite] = len(sprites)
+            sprites.append(sprite)
+        driven.append((ob, spriteIndex[sprite], driverZCurve(ob)))
+    if not sprites: return [], [], []
+    
+    frameIds = []
+    frameIndex = {}
+    def indexOf(id):
+        if id not in frameIndex:
+            frameIndex[id] = len(frameIds)
+            frameIds.append(id)
+        return frameIndex[id]
+    
+    state = [indexOf(sprite['sprite']) if 'sprite' in sprite else -1 for sprite in sprites]
+    enabled = dict((ob, False) for ob, i, curve in driven)
+    currentFrame = dict((ob, None) for ob, i, curve in driven)
+    table = []
+    for f in range(scene.frame_start, scene.frame_end + 1):
+        for ob, i, curve in driven:
+            z = curve.evaluate(f) if curve is not None else ob.location[2]
+            if 'frame' in ob:
+                if not enabled[ob] and z > 1:
+                    enabled[ob] = True
+                    state[i] = indexOf(ob['frame'])
+                elif enabled[ob] and z < 1:
+                    enabled[ob] = False
+            if 'framePattern' in ob and z > 1:
+                step = floor(z - 1)
+                frame = round(step * ob['frameIncrement'] + ob['startFrame'])
+                if frame != currentFrame[ob]:
+                    currentFrame[ob] = frame
+                    ids = getPatternSequence(ob)
+                    state[i] = indexOf(ids[step] if step < len(ids) else ob['framePattern'] % (frame))
+        table.extend(state)
+    return sprites, frameIds, table
+
+def bakeFrameTable(scene):
+    sprites, frameIds, table = evaluateFrameTable(scene)
+    if not sprites:
+        clearFrameTable(scene)
+        return 0, 0
+    scene['cheetahBakeSprites'] = '\n'.join(sprite.name for sprite in sprites)
+    scene['cheetahBakeFrames'] = '\n'.join(frameIds)
+    scene['cheetahBakeRange'] = [scene.frame_start, scene.frame_end]
+    scene['cheetahBakeTable'] = table
+    bakedTables.pop(scene.name, None)
+    return len(sprites), len(table)
+
+def clearFrameTable(scene):
+    for key in ('cheetahBakeSprites', 'cheetahBakeFrames', 'cheetahBakeRange', 'cheetahBakeTable'):
+        if key in scene: del scene[key]
+    bakedTables.pop(scene.name, None)
+
+class BakedTable:
+    """Python side copy of a scene's frame bake"""
+    def __init__(self, scene):
+        names = scene['cheetahBakeSprites'].split('\n') if scene['cheetahBakeSprites'] else []
+        self.sprites = [bpy.data.objects.get(name) for name in names]
+        self.frameIds = scene['cheetahBakeFrames'].split('\n')
+        self.first, self.last = scene['cheetahBakeRange']
+        self.table = scene['cheetahBakeTable'].to_list()
+
+    def apply(self, frame):
+        frame = min(max(frame, self.first), self.last)
+        count = len(self.sprites)
+        row = (frame - self.first) * count
+        for i in range(count):
+            index = self.table[row + i]
+            sprite = self.sprites[i]
+            if index >= 0 and sprite is not None: setSpriteFrameById(sprite, self.frameIds[index])
+
+class BakeFramesOperator(Operator):
+    """Evaluate all frame drivers over the scene frame range and store the result"""
+    bl_idname = "cheetah.bake_frames"
+    bl_label = "Bake Sprite Frames"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        spriteCount, cells = bakeFrameTable(context.scene)
+        self.report({'INFO'}, "Baked %d sprites over %d frames" % (spriteCount, cells // spriteCount if spriteCount else 0))
+        return {'FINISHED'}
+
+class ClearBakedFramesOperator(Operator):
+    """Remove the sprite frame bake and go back to live drivers"""
+    bl_idname = "cheetah.clear_baked_frames"
+    bl_label = "Clear Sprite Frame Bake"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        clearFrameTable(context.scene)
+        return {'FINISHED'}
+
+@persistent
 def preFrameHandler(scene):
-    print("Frame Change", scene.frame_current)
+    profile = scene.cheetah_profile
+    if profile: start = time.perf_counter()
+    if 'cheetahBakeTable' in scene:
+        baked = bakedTables.get(scene.name)
+        if baked is None: baked = bakedTables[scene.name] = BakedTable(scene)
+        baked.apply(scene.frame_current)
+        if profile: profiler.addTime('frameHandler', time.perf_counter() - start)
+        return
+    if len(bpy.data.objects) != driversObjectCount: rebuildDriverRegistry()
+    for ob in list(drivers):
+        try:
+            if not ob.users or 'driver' not in ob: raise ReferenceError
+        except ReferenceError:
+            del drivers[ob]
+            continue
+        if 'frame' in ob: # single frame type
+            if not ob['enabled'] and ob.location[2] > 1:
+                ob['enabled'] = True
+                setSpriteFrameById(ob.parent, ob['frame'])
+                if profile: profiler.count('framesSwapped')
+                
+            elif ob['enabled'] and ob.location[2] < 1:
+                ob['enabled'] = False
+
+        if 'framePattern' in ob: # pattern frame type
+            if ob.location[2] > 1:
+                step = floor(ob.location[2] - 1)
+                frame = round(step * ob['frameIncrement'] + ob['startFrame'])
+                if not frame == ob['currentFrame']:
+                    ob['currentFrame'] = frame
+                    ids = getPatternSequence(ob)
+                    setSpriteFrameById(ob.parent, ids[step] if step < len(ids) else ob['framePattern'] % (frame))
+                    if profile: profiler.count('framesSwapped')
+    if profile: profiler.addTime('frameHandler', time.perf_counter() - start)
+
+############ static batching
+# Sprites without children (so without frame drivers) are merged into one
+# mesh per atlas material. A batch object keeps the names of its sprites in
+# 'batchedSprites'; the sprites are unlinked from the scene and kept alive
+# by a fake user. Every batch face carries its sprite in polygon layers:
+#   sprite      frame id (string)
+#   spriteName  object name (string)
+#   anchorX/Z   anchor point (float)
+# Unbatching links the sprites again, moves each one by as much as its
+# face was moved in the batch and applies a changed 'sprite' face value.
+
+def viewportFrameTime(context, iterations=10):
+    """Seconds per viewport redraw, None without a window (e.g. in background mode)"""
+    if getattr(context, 'window', None) is None: return None
+    start = time.perf_counter()
+    try: bpy.ops.wm.redraw_timer(type='DRAW_WIN_SWAP', iterations=iterations)
+    except RuntimeError: return None
+    return (time.perf_counter() - start) / iterations
+
+def isAnimated(ob):
+    """True if ob or one of its parents has an action"""
+    while ob is not None:
+        if ob.animation_data is not None and ob.animation_data.action is not None: return True
+        ob = ob.parent
+    return False
+
+def findStaticSprites(scene):
+    """Sprites of scene grouped by material, skipping sprites with children or an animated parent chain"""
+    parents = set(ob.parent for ob in bpy.data.objects if ob.parent is not None)
+    groups = {}
+    for ob in scene.objects:
+        if ob.type != 'MESH' or 'sprite' not in ob or ob in parents: continue
+        if isAnimated(ob): continue
+        if not ob.data.materials or ob.data.materials[0] is None: continue
+        groups.setdefault(ob.data.materials[0], []).append(ob)
+    return groups
+
+def meshFaces(mesh):
+    """(vertex coordinates, [(face loop start, face vertex indices)], loop UVs) of a mesh"""
+    co = [0.0] * (len(mesh.vertices) * 3)
+    mesh.vertices.foreach_get('co', co)
+    indices = [0] * len(mesh.loops)
+    mesh.loops.foreach_get('vertex_index', indices)
+    uvs = [0.0] * (len(mesh.loops) * 2)
+    mesh.uv_layers.active.data.foreach_get('uv', uvs)
+    faces = []
+    for polygon in mesh.polygons:
+        start = polygon.loop_start
+        faces.append((start, indices[start:start + polygon.loop_total]))
+    return co, faces, uvs
+
+def batchSprites(context, mat, sprites):
+    """Merge sprites into one batch object, returns it"""
+    scn = context.scene
+    verts = []
+    uvs = []
+    loopTotals = []
+    faceSprites = []
+    faceCache = {}
+    for ob in sprites:
+        mesh = ob.data
+        data = faceCache.get(mesh)
+        if data is None: data = faceCache[mesh] = meshFaces(mesh)
+        co, faces, meshUvs = data
+        matrix = ob.matrix_world
+        for start, faceIndices in faces:
+            for i, index in enumerate(faceIndices):
+                verts.extend(matrix * Vector(co[index * 3:index * 3 + 3]))
+                uvs.extend(meshUvs[(start + i) * 2:(start + i) * 2 + 2])
+            loopTotals.append(len(faceIndices))
+            faceSprites.append(ob)
+    
+    mesh = bpy.data.meshes.new("batch " + mat.name)
+    mesh.vertices.add(len(verts) // 3)
+    mesh.vertices.foreach_set('co', verts)
+    mesh.loops.add(len(verts) // 3)
+    mesh.loops.foreach_set('vertex_index', range(len(verts) // 3))
+    mesh.polygons.add(len(loopTotals))
+    loopStarts = [0] * len(loopTotals)
+    for i in range(1, len(loopTotals)): loopStarts[i] = loopStarts[i - 1] + loopTotals[i - 1]
+    mesh.polygons.foreach_set('loop_start', loopStarts)
+    mesh.polygons.foreach_set('loop_total', loopTotals)
+    mesh.uv_textures.new()
+    mesh.uv_layers[0].data.foreach_set('uv', uvs)
+    img = getMaterialImage(mat)
+    for uv_face in mesh.uv_textures[0].data: uv_face.image = img
+    mesh.materials.append(mat)
+    
+    spriteLayer = mesh.polygon_layers_string.new(name='sprite')
+    nameLayer = mesh.polygon_layers_string.new(name='spriteName')
+    anchorXLayer = mesh.polygon_layers_float.new(name='anchorX')
+    anchorZLayer = mesh.polygon_layers_float.new(name='anchorZ')
+    for i, ob in enumerate(faceSprites):
+        spriteLayer.data[i].value = ob['sprite'].encode('utf-8')
+        nameLayer.data[i].value = ob.name.encode('utf-8')
+        anchor = getAnchorPointStored(ob) or (0.0, 0.0)
+        anchorXLayer.data[i].value = anchor[0]
+        anchorZLayer.data[i].value = anchor[1]
+    mesh.update(calc_edges=True)
+    
+    batch = bpy.data.objects.new(mesh.name, mesh)
+    batch.layers = sprites[0].layers
+    scn.objects.link(batch)
+    batch['spriteBatch'] = True
+    batch['batchedSprites'] = '\n'.join(ob.name for ob in sprites)
+    for ob in sprites:
+        ob.use_fake_user = True
+        scn.objects.unlink(ob)
+    return batch
+
+def unbatchSprites(context, batch):
+    """Link the sprites of a batch again and remove the batch, returns the sprites"""
+    scn = context.scene
+    mesh = batch.data
+    co = [0.0] * (len(mesh.vertices) * 3)
+    mesh.vertices.foreach_get('co', co)
+    matrix = batch.matrix_world
+    nameLayer = mesh.polygon_layers_string.get('spriteName')
+    spriteLayer = mesh.polygon_layers_string.get('sprite')
+    faces = {}
+    if nameLayer is not None:
+        for polygon, name, id in zip(mesh.polygons, nameLayer.data, spriteLayer.data):
+            faces[name.value.decode('utf-8')] = (polygon, id.value.decode('utf-8'))
+    
+    sprites = []
+    for name in batch['batchedSprites'].split('\n'):
+        ob = bpy.data.objects.get(name)
+        if ob is None: continue
+        if ob.name not in scn.objects: scn.objects.link(ob)
+        ob.use_fake_user = False
+        face = faces.get(name)
+        if face is not None:
+            polygon, id = face
+            # move the sprite by as much as its face moved in the batch
+            count = polygon.loop_total
+            moved = Vector((0.0, 0.0, 0.0))
+            for index in polygon.vertices: moved += matrix * Vector(co[index * 3:index * 3 + 3])
+            spriteData = meshFaces(ob.data)
+            original = Vector((0.0, 0.0, 0.0))
+            for index in spriteData[1][0][1]: original += ob.matrix_world * Vector(spriteData[0][index * 3:index * 3 + 3])
+            moved, original = moved / count, original / count
+            # location is in parent space, the face centers are in world space
+            if ob.parent is not None:
+                inverse = (ob.parent.matrix_world * ob.matrix_parent_inverse).inverted()
+                moved, original = inverse * moved, inverse * original
+            ob.location += moved - original
+            if id != ob['sprite']: setSpriteFrameById(ob, id)
+        sprites.append(ob)
+    scn.objects.unlink(batch)
+    bpy.data.objects.remove(batch)
+    if not mesh.users: bpy.data.meshes.remove(mesh)
+    return sprites
+
+class CheetahBatchSprites(Operator):
+    """Merge sprites without frame drivers into one mesh per atlas material"""
+    bl_idname = "cheetah.batch_sprites"
+    bl_label = "Batch Static Sprites"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    selectedOnly = bpy.props.BoolProperty(name="Selected Only", default=False)
+
+    def execute(self, context):
+        scn = context.scene
+        objectsBefore = len(scn.objects)
+        frameBefore = viewportFrameTime(context)
+        groups = findStaticSprites(scn)
+        batches = 0
+        for mat, sprites in groups.items():
+            if self.selectedOnly: sprites = [ob for ob in sprites if ob.select]
+            if not sprites: continue
+            batchSprites(context, mat, sprites)
+            batches += 1
+        frameAfter = viewportFrameTime(context)
+        self.report({'INFO'}, batchReport("%d batches" % batches, objectsBefore, len(scn.objects), frameBefore, frameAfter))
+        return {'FINISHED'}
+
+class CheetahUnbatchSprites(Operator):
+    """Split sprite batches back into their sprites"""
+    bl_idname = "cheetah.unbatch_sprites"
+    bl_label = "Unbatch Sprites"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    selectedOnly = bpy.props.BoolProperty(name="Selected Only", default=False)
+
+    def execute(self, context):
+        scn = context.scene
+        objectsBefore = len(scn.objects)
+        frameBefore = viewportFrameTime(context)
+        batches = [ob for ob in scn.objects if 'spriteBatch' in ob and (ob.select or not self.selectedOnly)]
+        sprites = 0
+        for batch in batches: sprites += len(unbatchSprites(context, batch))
+        frameAfter = viewportFrameTime(context)
+        self.report({'INFO'}, batchReport("%d sprites restored" % sprites, objectsBefore, len(scn.objects), frameBefore, frameAfter))
+        return {'FINISHED'}
+
+def batchReport(summary, objectsBefore, objectsAfter, frameBefore, frameAfter):
+    report = "%s, objects %d -> %d" % (summary, objectsBefore, objectsAfter)
+    if frameBefore is not None and frameAfter is not None:
+        report += ", viewport %.1f -> %.1f ms" % (frameBefore * 1e3, frameAfter * 1e3)
+    return report
+
+############ frame usage
+# Frame objects nothing refers to only cost file size and load time. A
+# single pass over bpy.data.objects collects the frame ids used by sprites
+# ('sprite'), drivers ('frame', expanded 'framePattern'), sprite batches and
+# bakes. Unused frame objects can be purged, Update Cheetah Atlas recreates
+# them from the .atlas file, or stubbed: their quads move into frame table
+# rows on the atlas empty (flagged 'frameStubs'), where sprites can still
+# find them, and Update Cheetah Atlas turns them back into objects.
+
+import subprocess
+import tempfile
+
+frameTableKeys = ('frameNames', 'frameGeometries', 'frameGeometryIndex', 'frameUvs', 'frameRects', 'frameBounds')
+
+def collectFrameUsage():
+    """(used frame ids, {atlas empty: frame objects})"""
+    used = set()
+    patterns = set()
+    frameObs = {}
+    atlases = bpy.data.objects.get('atlases')
+    if not frameIndexBuilt: rebuildFrameCache()
     for ob in bpy.data.objects:
-        if 'driver' in ob: 
-            print('driver found')
-            if 'frame' in ob: # single frame type
-                if not ob['enabled'] and ob.location[2] > 1:
-                    ob['enabled'] = True
-                    setSpriteFrameById(ob.parent, ob['frame'])
-                    
-                elif ob['enabled'] and ob.location[2] < 1:
-                    ob['enabled'] = False
-
-            if 'framePattern' in ob: # pattern frame type
-                if ob.location[2] > 1:
-                    frame = round(floor(ob.location[2] - 1) * ob['frameIncrement'] + ob['startFrame'])
-                    if not frame == ob['currentFrame']:
-                        ob['currentFrame'] = frame
-                        setSpriteFrameById(ob.parent, ob['framePattern'] % (frame))
+        if not ob.users: continue
+        parent = ob.parent
+        if atlases is not None and parent is not None and parent.parent == atlases and 'name' in ob:
+            frameObs.setdefault(parent, []).append(ob)
+            continue
+        if 'sprite' in ob: used.add(ob['sprite'])
+        if 'frame' in ob: used.add(ob['frame'])
+        if 'framePattern' in ob: patterns.add(ob['framePattern'])
+        if 'spriteBatch' in ob:
+            layer = ob.data.polygon_layers_string.get('sprite')
+            if layer is not None: used.update(face.value.decode('utf-8') for face in layer.data)
+    for scene in bpy.data.scenes:
+        if 'cheetahBakeFrames' in scene: used.update(scene['cheetahBakeFrames'].split('\n'))
+    
+    # the frame handler formats patterns past gaps in the numbering, so every match counts
+    if patterns:
+        regexes = [patternRegex(pattern) for pattern in patterns]
+        for atlas, obs in frameObs.items():
+            prefix = atlas['name'] + '|'
+            for ob in obs:
+                id = prefix + ob['name']
+                if any(regex.match(id) for regex in regexes): used.add(id)
+        for atlasName, table in frameTables.items():
+            for name in table.names:
+                id = atlasName + '|' + name
+                if any(regex.match(id) for regex in regexes): used.add(id)
+    return used, frameObs
+
+# conversion type -> regex for what it makes of an integer, with any flags and width
+conversionRegexes = dict.fromkeys('diusra', r' *[-+]?\d+ *')
+conversionRegexes.update(x=r' *[-+]?(?:0x)?[0-9a-f]+ *', X=r' *[-+]?(?:0X)?[0-9A-F]+ *', o=r' *[-+]?(?:0o)?[0-7]+ *')
+
+def patternRegex(pattern):
+    """Regex matching the ids pattern % n gives for any integer n, ValueError for conversions it can't follow"""
+    parts = re.split(r'(%[-+ 0#]*\d*(?:\.\d*)?[hlL]?.)', pattern)
+    regex = ''
+    for i, part in enumerate(parts):
+        if i % 2 == 0: regex += re.escape(part)
+        elif part == '%%': regex += '%'
+        elif part[-1] in conversionRegexes: regex += conversionRegexes[part[-1]]
+        else: raise ValueError("Can't tell which frames pattern %s uses" % pattern)
+    return re.compile(regex + r'\Z')
+
+def frameUsageRows(used, frameObs):
+    """(atlas name, frame count, used frame count) per atlas"""
+    rows = []
+    if 'atlases' not in bpy.data.objects: return rows
+    for atlas in bpy.data.objects['atlases'].children:
+        names = [ob['name'] for ob in frameObs.get(atlas, ())]
+        if 'frameNames' in atlas: names += atlas['frameNames'].split('\n')
+        prefix = atlas['name'] + '|'
+        rows.append((atlas['name'], len(names), sum(1 for name in names if prefix + name in used)))
+    return rows
+
+def removeFrameObjects(obs):
+    for ob in obs:
+        mesh = ob.data
+        cache.pop(getFrameIdOfFrameObject(ob), None)
+        bpy.data.objects.remove(ob, do_unlink=True)
+        if not mesh.users: bpy.data.meshes.remove(mesh)
+
+def fillAtlasKeys(atlas, obs):
+    """Store material, unitPerPixel and imageSize on atlases imported before they were kept"""
+    mesh = obs[0].data
+    if atlas.get('material') not in bpy.data.materials:
+        if mesh.materials and mesh.materials[0] is not None: atlas['material'] = mesh.materials[0].name
+        else: findAtlasMaterial(atlas)
+    if 'unitPerPixel' not in atlas:
+        # the second helper vertex sits at (origW, 0, origH) in units
+        ob = obs[0]
+        if 'rect' in ob and ob['rect'][6] and len(mesh.vertices) == 6: atlas['unitPerPixel'] = mesh.vertices[5].co[0] / ob['rect'][6]
+        else: atlas['unitPerPixel'] = 1 / bpy.context.scene.cheetah_pixel_per_unit
+    if 'imageSize' not in atlas:
+        img = mesh.uv_textures.active.data[0].image if mesh.uv_textures.active else None
+        if img is not None: atlas['imageSize'] = list(img.size)
+
+def stubFrameObjects(atlas, obs):
+    """Move frame objects into frame table rows on their atlas"""
+    fillAtlasKeys(atlas, obs)
+    names, verts, uvs, rects, bounds = [], [], [], [], []
+    if 'frameNames' in atlas:
+        table = FrameTable(atlas)
+        names += table.names
+        for i in range(len(table.names)):
+            verts += table.frameVerts(i)
+            uvs += table.frameUvs(i)
+        rects += atlas['frameRects'].to_list()
+        bounds += table.bounds
+    for ob in obs:
+        co = [0.0] * 18
+        ob.data.vertices.foreach_get('co', co)
+        uv = [0.0] * 8
+        ob.data.uv_layers.active.data.foreach_get('uv', uv)
+        names.append(ob['name'])
+        verts += co
+        uvs += uv
+        rects += ob['rect'].to_list() if 'rect' in ob else [0] * 9
+        bounds += ob['bounds'].to_list() if 'bounds' in ob else vertsBounds(co)
+    storeFrameRows(atlas, names, verts, uvs, rects, bounds)
+    atlas['frameStubs'] = True
+    removeFrameObjects(obs)
+    frameTables[atlas['name']] = FrameTable(atlas)
+
+def restoreFrameStubs(atlas):
+    """Turn the stubbed frames of an atlas back into frame objects, stacked above the existing ones"""
+    table = FrameTable(atlas)
+    rects = atlas['frameRects'].to_list()
+    unitPerPixel = atlas.get('unitPerPixel', 1 / bpy.context.scene.cheetah_pixel_per_unit)
+    img = getMaterialImage(table.material)
+    top = 0.0
+    for ob in bpy.data.objects:
+        if ob.parent != atlas: continue
+        if 'rect' in ob: height = ob['rect'][7] * unitPerPixel
+        else: height = ob.dimensions[2]
+        top = max(top, ob.location[2] + height)
+    scn = bpy.context.scene
+    layers = [layer == 10 for layer in range(20)]
+    for i, name in enumerate(table.names):
+        mesh = newQuadMesh(name, table.frameVerts(i), table.frameUvs(i))
+        mesh.uv_textures[0].data[0].image = img
+        mesh.materials.append(table.material)
+        ob = bpy.data.objects.new(name, mesh)
+        ob.parent = atlas
+        ob.layers = layers
+        scn.objects.link(ob)
+        ob['name'] = name
+        rect = rects[i * 9:i * 9 + 9]
+        bounds = table.frameBounds(i)
+        # frames stubbed from objects without 'rect' stored zeros
+        if any(rect): ob['rect'] = rect
+        ob['bounds'] = bounds
+        ob.location[2] = top
+        top += rect[7] * unitPerPixel if any(rect) else bounds[3] - bounds[1]
+        cache[atlas['name'] + '|' + name] = ob
+    for key in frameTableKeys: del atlas[key]
+    del atlas['frameStubs']
+    frameTables.pop(atlas['name'], None)
+    frameData.clear()
+    bumpItemsVersion()
+
+def blenderRunTime(*args):
+    start = time.perf_counter()
+    subprocess.run([bpy.app.binary_path, '-b', '--factory-startup'] + list(args),
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+def blendFileStats(baseline):
+    """(size in bytes, open seconds) of the current state, saved to a temporary copy"""
+    handle, path = tempfile.mkstemp(suffix='.blend')
+    os.close(handle)
+    try:
+        bpy.ops.wm.save_as_mainfile(filepath=path, copy=True, check_existing=False)
+        return os.path.getsize(path), blenderRunTime(path) - baseline
+    finally: os.remove(path)
+
+class CheetahFrameUsage(Operator):
+    """Report which atlas frames are used and purge or stub the unused frame objects"""
+    bl_idname = "cheetah.frame_usage"
+    bl_label = "Frame Usage"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    action = EnumProperty(
+          items=(('REPORT', "Report", "Only print the usage of every atlas"),
+                 ('STUB', "Stub", "Replace unused frame objects by frame table rows, Update Cheetah Atlas restores them"),
+                 ('PURGE', "Purge", "Delete unused frame objects, Update Cheetah Atlas recreates them from the .atlas file")),
+          name="Action", default='REPORT')
+    measure = BoolProperty(
+          name="Measure File", default=False,
+          description="Save copies before and after and time opening them in a background Blender")
+
+    def execute(self, context):
+        if self.measure:
+            baseline = blenderRunTime()
+            before = blendFileStats(baseline)
+        try: used, frameObs = collectFrameUsage()
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        total = usedTotal = 0
+        for atlasName, count, usedCount in frameUsageRows(used, frameObs):
+            print("%s: %d of %d frames used" % (atlasName, usedCount, count))
+            total += count
+            usedTotal += usedCount
+        report = "%d of %d frames used" % (usedTotal, total)
+        
+        if self.action != 'REPORT':
+            changed = 0
+            for atlas, obs in frameObs.items():
+                prefix = atlas['name'] + '|'
+                unused = [ob for ob in obs if prefix + ob['name'] not in used]
+                if not unused: continue
+                if self.action == 'STUB': stubFrameObjects(atlas, unused)
+                else: removeFrameObjects(unused)
+                changed += len(unused)
+            frameData.clear()
+            patternSequences.clear()
+            bumpItemsVersion()
+            report += ", %d frame objects %s" % (changed, 'stubbed' if self.action == 'STUB' else 'purged')
+        
+        if self.measure:
+            after = blendFileStats(baseline)
+            report += ", file %.1f -> %.1f MB, open %.2f -> %.2f s" % (before[0] / 1e6, after[0] / 1e6, before[1], after[1])
+        self.report({'INFO'}, report)
+        return {'FINISHED'}
 
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+############ runtime export
+# Writes the sprites of a scene to a CheetahRuntimeFormat file: the frames
+# they use (quad, UVs and bounds without anchor offset), their transforms
+# and anchor points, and a frame timeline taken from the scene bake, or
+# evaluated from the drivers when the scene has none.
+
+import CheetahRuntimeFormat
+
+def runtimeFrameGeometry(id):
+    data = getFrameData(id, False)
+    if data is None: return None
+    verts, uvs, mat, bounds = data
+    quad = []
+    for i in range(4): quad.extend((verts[i * 3], verts[i * 3 + 2]))
+    return quad + list(uvs) + list(bounds)
+
+def collectRuntimeData(scene):
+    if 'cheetahBakeTable' in scene:
+        baked = BakedTable(scene)
+        bakedSprites, bakedFrameIds, first, bakedTable = baked.sprites, baked.frameIds, baked.first, baked.table
+    else:
+        bakedSprites, bakedFrameIds, bakedTable = evaluateFrameTable(scene)
+        first = scene.frame_start
+    
+    sprites = [ob for ob in scene.objects if ob.type == 'MESH' and 'sprite' in ob]
+    for batch in scene.objects:
+        if 'spriteBatch' not in batch: continue
+        for name in batch['batchedSprites'].split('\n'):
+            ob = bpy.data.objects.get(name)
+            if ob is not None: sprites.append(ob)
+    spriteIndex = dict((ob, i) for i, ob in enumerate(sprites))
+    
+    frames = []
+    frameIndex = {}
+    def indexOf(id):
+        if id not in frameIndex:
+            geometry = runtimeFrameGeometry(id)
+            if geometry is None: frameIndex[id] = -1
+            else:
+                frameIndex[id] = len(frames)
+                frames.append((id, id.split('|')[0], geometry))
+        return frameIndex[id]
+    
+    spriteRecords = []
+    for ob in sprites:
+        parent = spriteIndex.get(ob.parent, -1)
+        anchor = getAnchorPointStored(ob) or (0.0, 0.0)
+        # relative to an exported parent (matrix_local has the parent inverse),
+        # otherwise any parent that is not a sprite is folded in
+        matrix = ob.matrix_local if parent >= 0 else ob.matrix_world
+        location, rotation, scale = matrix.decompose()
+        transform = list(location) + list(rotation.to_euler()) + list(scale) + list(anchor)
+        spriteRecords.append((ob.name, indexOf(ob['sprite']), parent, transform))
     
+    timeline = []
+    count = len(bakedSprites)
+    if count:
+        columns = [spriteIndex.get(ob, -1) for ob in bakedSprites]
+        frameMap = [indexOf(id) for id in bakedFrameIds]
+        for row in range(0, len(bakedTable), count):
+            line = [-1] * len(sprites)
+            for i in range(count):
+                index = bakedTable[row + i]
+                if index >= 0 and columns[i] >= 0: line[columns[i]] = frameMap[index]
+            timeline.extend(line)
+    return CheetahRuntimeFormat.RuntimeData(frames, spriteRecords, first, timeline)
+
+from bpy_extras.io_utils import ExportHelper
+
+class CheetahExportRuntime(Operator, ExportHelper):
+    """Export sprites, frames and the frame timeline to a binary runtime file"""
+    bl_idname = "cheetah.export_runtime"
+    bl_label = "Export Runtime Data"
+
+    filename_ext = ".chsp"
+    filter_glob = StringProperty(
+            default="*.chsp",
+            options={'HIDDEN'},
+            )
+
+    def execute(self, context):
+        data = collectRuntimeData(context.scene)
+        try: CheetahRuntimeFormat.write(self.filepath, data)
+        except (OSError, CheetahRuntimeFormat.RuntimeFormatError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.report({'INFO'}, "Exported %d sprites, %d frames, %d timeline frames" %
+                    (len(data.sprites), len(data.frames), len(data.timeline) // len(data.sprites) if data.sprites else 0))
+        return {'FINISHED'}
+
 def register():
     bpy.types.Scene.cheetah_relpath = bpy.props.StringProperty \
       (
@@ -594,31 +2525,127 @@ def register():
       default = 100.0,
       description = "Default pixel/unit value for the scene",
       )
+    bpy.types.Scene.cheetah_proxy = bpy.props.EnumProperty \
+      (
+      name = "Viewport Texture",
+      items = proxyItems,
+      default = 'FULL',
+      description = "Size of the atlas sheets in the viewport, renders always use the full size",
+      update = updateProxy,
+      )
+    bpy.types.Scene.cheetah_profile = bpy.props.BoolProperty \
+      (
+      name = "Profile",
+      default = False,
+      description = "Collect import and frame change timings",
+      )
+    bpy.types.Scene.cheetah_profile_path = bpy.props.StringProperty \
+      (
+      name = "Profile Output",
+      default = "",
+      description = "JSON file the profile summary is written to after each import and render",
+      subtype = 'FILE_PATH'
+      )
     bpy.utils.register_class(CheetahImportAtlas)
+    bpy.utils.register_class(CheetahReimportAtlas)
+    bpy.utils.register_class(CheetahImportAtlasDirectory)
+    bpy.utils.register_class(CheetahPackAtlas)
     bpy.utils.register_class(CheetahAtlasLayout)
     bpy.utils.register_class(CheetahSetSpriteFrame)
+    bpy.utils.register_class(CheetahSearchSpriteFrame)
     bpy.utils.register_class(CheetahAddSpriteOperator)
+    bpy.utils.register_class(CheetahAddSpritesOperator)
     bpy.utils.register_class(SetAnchorPointOperator)
+    bpy.utils.register_class(SetAnchorPointSelectedOperator)
     bpy.utils.register_class(AddSingleFrameDriverOperator)
+    bpy.utils.register_class(AddPatternDriverOperator)
+    bpy.utils.register_class(BakeFramesOperator)
+    bpy.utils.register_class(ClearBakedFramesOperator)
     bpy.utils.register_class(AddClickAnimationOperator)
+    bpy.utils.register_class(RefreshDriversOperator)
+    bpy.utils.register_class(ResetProfileOperator)
+    bpy.utils.register_class(CheetahExportRuntime)
+    bpy.utils.register_class(CheetahSpriteMeshMode)
+    bpy.utils.register_class(CheetahPurgeFrameMeshes)
+    bpy.utils.register_class(CheetahBatchSprites)
+    bpy.utils.register_class(CheetahUnbatchSprites)
+    bpy.utils.register_class(CheetahFrameUsage)
     bpy.types.INFO_MT_mesh_add.append(menu_func)
     bpy.app.handlers.frame_change_pre.clear()
     bpy.app.handlers.frame_change_pre.append(preFrameHandler)        
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+        handlers.append(invalidateFrameCache)
+        handlers.append(rebuildDriverRegistryHandler)
+    # bpy.data is restricted while add-ons are enabled at startup, load_post covers that case
+    try: rebuildDriverRegistry()
+    except AttributeError: pass
+    bpy.app.handlers.render_complete.append(dumpProfileHandler)
+    bpy.app.handlers.render_cancel.append(dumpProfileHandler)
+    bpy.app.handlers.render_init.append(fullSizeRenderHandler)
+    bpy.app.handlers.render_complete.append(proxyRenderHandler)
+    bpy.app.handlers.render_cancel.append(proxyRenderHandler)
 
 def unregister():
     del bpy.types.Scene.cheetah_relpath
     del bpy.types.Scene.cheetah_pixel_per_unit
+    del bpy.types.Scene.cheetah_proxy
+    del bpy.types.Scene.cheetah_profile
+    del bpy.types.Scene.cheetah_profile_path
     bpy.utils.unregister_class(CheetahImportAtlas)
+    bpy.utils.unregister_class(CheetahReimportAtlas)
+    bpy.utils.unregister_class(CheetahImportAtlasDirectory)
+    bpy.utils.unregister_class(CheetahPackAtlas)
     bpy.utils.unregister_class(CheetahAtlasLayout)
     bpy.utils.unregister_class(CheetahSetSpriteFrame)
+    bpy.utils.unregister_class(CheetahSearchSpriteFrame)
     bpy.utils.unregister_class(CheetahAddSpriteOperator)
+    bpy.utils.unregister_class(CheetahAddSpritesOperator)
     bpy.utils.unregister_class(SetAnchorPointOperator)
+    bpy.utils.unregister_class(SetAnchorPointSelectedOperator)
     bpy.utils.unregister_class(AddSingleFrameDriverOperator)
+    bpy.utils.unregister_class(AddPatternDriverOperator)
+    bpy.utils.unregister_class(BakeFramesOperator)
+    bpy.utils.unregister_class(ClearBakedFramesOperator)
     bpy.utils.unregister_class(AddClickAnimationOperator)
+    bpy.utils.unregister_class(RefreshDriversOperator)
+    bpy.utils.unregister_class(ResetProfileOperator)
+    bpy.utils.unregister_class(CheetahExportRuntime)
+    bpy.utils.unregister_class(CheetahSpriteMeshMode)
+    bpy.utils.unregister_class(CheetahPurgeFrameMeshes)
+    bpy.utils.unregister_class(CheetahBatchSprites)
+    bpy.utils.unregister_class(CheetahUnbatchSprites)
+    bpy.utils.unregister_class(CheetahFrameUsage)
     bpy.types.INFO_MT_mesh_add.remove(menu_func)
     bpy.app.handlers.frame_change_pre.remove(preFrameHandler)        
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+        handlers.remove(invalidateFrameCache)
+        handlers.remove(rebuildDriverRegistryHandler)
+    bpy.app.handlers.render_complete.remove(dumpProfileHandler)
+    bpy.app.handlers.render_cancel.remove(dumpProfileHandler)
+    bpy.app.handlers.render_init.remove(fullSizeRenderHandler)
+    bpy.app.handlers.render_complete.remove(proxyRenderHandler)
+    bpy.app.handlers.render_cancel.remove(proxyRenderHandler)
+
 
 
+# Headless batch import:
+#   blender --background scene.blend --python CheetahAtlasImporter.py -- --import-dir DIR [--pattern GLOB] [--recursive] [--processes]
+#       [--layout STACK|GRID] [--columns N] [--save]
 
 if __name__ == "__main__":
     register()
+    if '--' in sys.argv:
+        import argparse
+        parser = argparse.ArgumentParser(prog="CheetahAtlasImporter.py")
+        parser.add_argument('--import-dir')
+        parser.add_argument('--pattern', default='*.atlas')
+        parser.add_argument('--recursive', action='store_true')
+        parser.add_argument('--processes', action='store_true')
+        parser.add_argument('--layout', choices=[item[0] for item in frameLayoutItems], default='STACK')
+        parser.add_argument('--columns', type=int, default=0)
+        parser.add_argument('--save', action='store_true')
+        args = parser.parse_args(sys.argv[sys.argv.index('--') + 1:])
+        if args.import_dir:
+            printImportTimings(*importAtlasDirectory(bpy.context, args.import_dir, args.pattern, args.recursive, args.processes,
+                                                     layout=args.layout, columns=args.columns))
+            if args.save: bpy.ops.wm.save_mainfile()
@@ -0,0 +1,365 @@
+"""Cheetah compatible atlas packer, usable without Blender"""
+
+# Packs a folder of PNG frames into one sheet next to the output path:
+#   <name>.png    the sheet, RGBA
+#   <name>.atlas  "textures:" header and one CheetahAtlas frame line per image
+#   <name>.pack   json manifest: settings plus mtime, size, trim box and
+#                 sheet rect of every source image
+# Frames are trimmed to their opaque pixels and placed with MaxRects (best
+# short side fit), optionally rotated by 90 degrees clockwise. Frame names
+# are the image paths relative to the folder, without extension.
+#
+# Only images whose mtime or size changed are decoded again; the pixels of
+# the others are cut out of the previous sheet. With no change at all the
+# pack is skipped.
+
+import os
+import struct
+import zlib
+import json
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+MANIFEST_VERSION = 1
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+class PackError(ValueError):
+    pass
+
+############ png
+
+def paethPredictor(a, b, c):
+    p = a + b - c
+    pa = abs(p - a)
+    pb = abs(p - b)
+    pc = abs(p - c)
+    if pa <= pb and pa <= pc: return a
+    if pb <= pc: return b
+    return c
+
+def unfilter(data, width, height, bpp):
+    stride = width * bpp
+    out = bytearray(stride * height)
+    prev = bytearray(stride)
+    pos = 0
+    for y in range(height):
+        filterType = data[pos]
+        row = bytearray(data[pos + 1:pos + 1 + stride])
+        pos += 1 + stride
+        if filterType == 1:
+            for i in range(bpp, stride): row[i] = (row[i] + row[i - bpp]) & 255
+        elif filterType == 2:
+            for i in range(stride): row[i] = (row[i] + prev[i]) & 255
+        elif filterType == 3:
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + ((left + prev[i]) >> 1)) & 255
+        elif filterType == 4:
+            for i in range(stride):
+                if i >= bpp: row[i] = (row[i] + paethPredictor(row[i - bpp], prev[i], prev[i - bpp])) & 255
+                else: row[i] = (row[i] + prev[i]) & 255
+        elif filterType != 0:
+            raise PackError("unknown png filter %d" % filterType)
+        out[y * stride:(y + 1) * stride] = row
+        prev = row
+    return out
+
+def readPng(path):
+    """Decode a PNG to (width, height, RGBA bytes). 8 and 16 bit, not interlaced"""
+    with open(path, 'rb') as f: data = f.read()
+    if data[:8] != PNG_SIGNATURE: raise PackError("%s: not a png file" % path)
+    pos = 8
+    idat = []
+    palette = None
+    transparency = None
+    header = None
+    while pos < len(data):
+        length, kind = struct.unpack_from('>I4s', data, pos)
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if kind == b'IHDR': header = struct.unpack('>IIBBBBB', chunk)
+        elif kind == b'PLTE': palette = chunk
+        elif kind == b'tRNS': transparency = chunk
+        elif kind == b'IDAT': idat.append(chunk)
+        elif kind == b'IEND': break
+    if header is None: raise PackError("%s: missing IHDR" % path)
+    width, height, bitDepth, colorType, compression, filterMethod, interlace = header
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}.get(colorType)
+    if channels is None: raise PackError("%s: unknown color type %d" % (path, colorType))
+    if bitDepth not in (8, 16) or (colorType == 3 and bitDepth != 8):
+        raise PackError("%s: unsupported bit depth %d" % (path, bitDepth))
+    if interlace: raise PackError("%s: interlaced png is not supported" % path)
+
+    raw = unfilter(zlib.decompress(b''.join(idat)), width, height, channels * bitDepth // 8)
+    if bitDepth == 16: raw = raw[0::2]
+    pixels = bytearray(width * height * 4)
+    if colorType == 6: pixels[:] = raw
+    elif colorType == 2:
+        for c in range(3): pixels[c::4] = raw[c::3]
+        pixels[3::4] = b'\xff' * (width * height)
+    elif colorType == 0:
+        for c in range(3): pixels[c::4] = raw
+        pixels[3::4] = b'\xff' * (width * height)
+    elif colorType == 4:
+        for c in range(3): pixels[c::4] = raw[0::2]
+        pixels[3::4] = raw[1::2]
+    else:
+        if palette is None: raise PackError("%s: palette image without PLTE" % path)
+        palette = palette + b'\0' * (768 - len(palette))
+        alpha = (transparency or b'') + b'\xff' * (256 - len(transparency or b''))
+        for c in range(3): pixels[c::4] = bytes(raw).translate(palette[c::3])
+        pixels[3::4] = bytes(raw).translate(alpha)
+    return width, height, bytes(pixels)
+
+def pngChunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+def writePng(path, width, height, pixels, level=6):
+    stride = width * 4
+    raw = b''.join(b'\0' + pixels[y * stride:(y + 1) * stride] for y in range(height))
+    with open(path, 'wb') as f:
+        f.write(PNG_SIGNATURE)
+        f.write(pngChunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        f.write(pngChunk(b'IDAT', zlib.compress(raw, level)))
+        f.write(pngChunk(b'IEND', b''))
+
+############ pixels
+# RGBA pixels are handled as 32 bit words, the byte order never matters
+# since words are only moved around.
+
+def cropPixels(width, pixels, left, top, w, h):
+    stride = width * 4
+    return b''.join(pixels[(top + y) * stride + left * 4:(top + y) * stride + (left + w) * 4] for y in range(h))
+
+def rotateClockwise(width, height, pixels):
+    """Rotate by 90 degrees clockwise, the result is height wide and width high"""
+    words = array('I', pixels)
+    out = array('I')
+    for x in range(width): out.extend(words[x::width][::-1])
+    return out.tobytes()
+
+def rotateCounterClockwise(width, height, pixels):
+    words = array('I', pixels)
+    out = array('I')
+    for x in range(width - 1, -1, -1): out.extend(words[x::width])
+    return out.tobytes()
+
+def trimBox(width, height, pixels):
+    """(left, top, width, height) of the pixels with alpha > 0, a 1x1 box for empty images"""
+    alpha = pixels[3::4]
+    top = None
+    left = width
+    right = 0
+    for y in range(height):
+        row = alpha[y * width:(y + 1) * width]
+        stripped = row.lstrip(b'\0')
+        if not stripped: continue
+        if top is None: top = y
+        bottom = y
+        left = min(left, width - len(stripped))
+        right = max(right, len(row.rstrip(b'\0')))
+    if top is None: return 0, 0, 1, 1
+    return left, top, right - left, bottom - top + 1
+
+def loadFrame(path):
+    """Decode and trim one image: (origW, origH, left, top, w, h, trimmed pixels)"""
+    width, height, pixels = readPng(path)
+    left, top, w, h = trimBox(width, height, pixels)
+    return width, height, left, top, w, h, cropPixels(width, pixels, left, top, w, h)
+
+############ packing
+
+class MaxRects:
+    """MaxRects bin, best short side fit"""
+    def __init__(self, width, height, allowRotation=True):
+        self.width = width
+        self.height = height
+        self.allowRotation = allowRotation
+        self.free = [(0, 0, width, height)]
+
+    def insert(self, w, h):
+        """Place a w x h rect, returns (x, y, rotated) or None"""
+        best = None
+        for fx, fy, fw, fh in self.free:
+            if w <= fw and h <= fh:
+                score = (min(fw - w, fh - h), max(fw - w, fh - h))
+                if best is None or score < best[0]: best = (score, fx, fy, w, h, False)
+            if self.allowRotation and w != h and h <= fw and w <= fh:
+                score = (min(fw - h, fh - w), max(fw - h, fh - w))
+                if best is None or score < best[0]: best = (score, fx, fy, h, w, True)
+        if best is None: return None
+        score, x, y, w, h, rotated = best
+        self.place(x, y, w, h)
+        return x, y, rotated
+
+    def place(self, x, y, w, h):
+        kept = []
+        split = []
+        for fx, fy, fw, fh in self.free:
+            if x >= fx + fw or x + w <= fx or y >= fy + fh or y + h <= fy:
+                kept.append((fx, fy, fw, fh))
+                continue
+            if x > fx: split.append((fx, fy, x - fx, fh))
+            if x + w < fx + fw: split.append((x + w, fy, fx + fw - x - w, fh))
+            if y > fy: split.append((fx, fy, fw, y - fy))
+            if y + h < fy + fh: split.append((fx, y + h, fw, fy + fh - y - h))
+        # kept rects were already maximal and a split rect lies inside a
+        # removed one, so only the split rects can be contained in another
+        free = kept
+        for i, a in enumerate(split):
+            contained = False
+            for j, b in enumerate(kept + split):
+                if b[0] <= a[0] and b[1] <= a[1] and a[0] + a[2] <= b[0] + b[2] and a[1] + a[3] <= b[1] + b[3]:
+                    if a != b or (j >= len(kept) and j - len(kept) < i):
+                        contained = True
+                        break
+            if not contained: free.append(a)
+        self.free = free
+
+def packRects(sizes, maxSize=4096, padding=2, allowRotation=True):
+    """Place (w, h) sizes on the smallest power of two sheet that fits.
+
+    Returns (sheetW, sheetH, [(x, y, rotated)] in input order)."""
+    order = sorted(range(len(sizes)), key=lambda i: (max(sizes[i]), sizes[i][0] * sizes[i][1]), reverse=True)
+    area = sum((w + padding) * (h + padding) for w, h in sizes)
+    widest = max([max(w, h) if allowRotation else w for w, h in sizes] or [1]) + padding
+    tallest = max([max(w, h) if allowRotation else h for w, h in sizes] or [1]) + padding
+    sheetW = sheetH = 1
+    while sheetW < widest or sheetW * sheetW < area: sheetW *= 2
+    while sheetH < tallest or sheetW * sheetH < area: sheetH *= 2
+    while sheetW <= maxSize and sheetH <= maxSize:
+        bin = MaxRects(sheetW, sheetH, allowRotation)
+        places = [None] * len(sizes)
+        for i in order:
+            w, h = sizes[i]
+            placed = bin.insert(w + padding, h + padding)
+            if placed is None: break
+            places[i] = placed
+        else:
+            return sheetW, sheetH, places
+        if sheetW <= sheetH: sheetW *= 2
+        else: sheetH *= 2
+    raise PackError("frames do not fit on a %dx%d sheet" % (maxSize, maxSize))
+
+############ pipeline
+
+class PackResult:
+    def __init__(self, atlasPath, frames, decoded, sheetSize, efficiency, elapsed, skipped):
+        self.atlasPath = atlasPath
+        self.frames = frames
+        self.decoded = decoded
+        self.sheetSize = sheetSize
+        self.efficiency = efficiency
+        self.elapsed = elapsed
+        self.skipped = skipped
+
+    def __str__(self):
+        if self.skipped: return "%s: up to date (%d frames)" % (self.atlasPath, self.frames)
+        return "%s: %d frames (%d decoded) on %dx%d, %.1f%% efficiency, %.2f s" % (
+            self.atlasPath, self.frames, self.decoded, self.sheetSize[0], self.sheetSize[1],
+            self.efficiency * 100, self.elapsed)
+
+def findImages(folder):
+    """{frame name: path} for every .png below folder"""
+    images = {}
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith('.png'): continue
+            path = os.path.join(root, name)
+            images[os.path.splitext(os.path.relpath(path, folder))[0].replace(os.sep, '/')] = path
+    return images
+
+def readManifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f: manifest = json.load(f)
+    except (OSError, ValueError): return None
+    if manifest.get('version') != MANIFEST_VERSION: return None
+    return manifest
+
+def packFolder(folder, atlasPath, maxSize=4096, padding=2, allowRotation=True, processes=None, force=False):
+    """Pack the PNG frames of folder into atlasPath and the matching .png, returns a PackResult"""
+    start = time.perf_counter()
+    base = os.path.splitext(atlasPath)[0]
+    sheetPath = base + '.png'
+    manifestPath = base + '.pack'
+    settings = {'maxSize': maxSize, 'padding': padding, 'allowRotation': allowRotation}
+
+    images = findImages(folder)
+    if not images: raise PackError("%s: no png frames" % folder)
+    stats = {}
+    for name, path in images.items():
+        stat = os.stat(path)
+        stats[name] = [stat.st_mtime, stat.st_size]
+
+    manifest = None if force else readManifest(manifestPath)
+    outputsExist = os.path.exists(sheetPath) and os.path.exists(atlasPath)
+    if manifest is not None and outputsExist and manifest['settings'] == settings and \
+       dict((name, entry['stat']) for name, entry in manifest['frames'].items()) == stats:
+        return PackResult(atlasPath, len(images), 0, tuple(manifest['sheetSize']), manifest['efficiency'],
+                          time.perf_counter() - start, True)
+
+    # unchanged frames come out of the previous sheet, the rest is decoded in parallel
+    frames = {}
+    reuse = []
+    if manifest is not None and outputsExist:
+        for name, entry in manifest['frames'].items():
+            if stats.get(name) == entry['stat']: reuse.append((name, entry))
+    if reuse:
+        try:
+            oldW, oldH, oldPixels = readPng(sheetPath)
+            for name, entry in reuse:
+                origW, origH, left, top, w, h = entry['trim']
+                x, y, rotated = entry['rect']
+                if rotated: pixels = rotateCounterClockwise(h, w, cropPixels(oldW, oldPixels, x, y, h, w))
+                else: pixels = cropPixels(oldW, oldPixels, x, y, w, h)
+                frames[name] = (origW, origH, left, top, w, h, pixels)
+        except (OSError, PackError): frames.clear()
+    pending = sorted(name for name in images if name not in frames)
+    if len(pending) > 1 and processes != 0:
+        with ProcessPoolExecutor(processes) as executor:
+            for name, frame in zip(pending, executor.map(loadFrame, [images[name] for name in pending], chunksize=4)):
+                frames[name] = frame
+    else:
+        for name in pending: frames[name] = loadFrame(images[name])
+
+    names = sorted(frames)
+    sizes = [(frames[name][4], frames[name][5]) for name in names]
+    sheetW, sheetH, places = packRects(sizes, maxSize, padding, allowRotation)
+
+    sheet = bytearray(sheetW * sheetH * 4)
+    stride = sheetW * 4
+    lines = ["textures: %s" % os.path.basename(sheetPath)]
+    entries = {}
+    usedArea = 0
+    for name, (x, y, rotated) in zip(names, places):
+        origW, origH, left, top, w, h, pixels = frames[name]
+        usedArea += w * h
+        if rotated:
+            pixels = rotateClockwise(w, h, pixels)
+            rectW, rectH = h, w
+            lines.append("%s\t%d\t%d\t%d\t%d\t%d\t%d\t%d\t%d\tr" % (name, x, y, rectW, rectH, top, left, origW, origH))
+        else:
+            rectW, rectH = w, h
+            lines.append("%s\t%d\t%d\t%d\t%d\t%d\t%d\t%d\t%d" % (name, x, y, rectW, rectH, left, top, origW, origH))
+        rowBytes = rectW * 4
+        for row in range(rectH):
+            offset = (y + row) * stride + x * 4
+            sheet[offset:offset + rowBytes] = pixels[row * rowBytes:(row + 1) * rowBytes]
+        entries[name] = {'stat': stats[name], 'trim': [origW, origH, left, top, w, h], 'rect': [x, y, rotated]}
+    efficiency = float(usedArea) / (sheetW * sheetH)
+
+    writePng(sheetPath, sheetW, sheetH, bytes(sheet))
+    with open(atlasPath, 'w', encoding='utf-8') as f: f.write('\n'.join(lines) + '\n')
+    with open(manifestPath, 'w', encoding='utf-8') as f:
+        json.dump({'version': MANIFEST_VERSION, 'settings': settings, 'sheetSize': [sheetW, sheetH],
+                   'efficiency': efficiency, 'frames': entries}, f)
+    return PackResult(atlasPath, len(names), len(pending), (sheetW, sheetH), efficiency, time.perf_counter() - start, False)
+
+if __name__ == "__main__":
+    # python CheetahPacker.py <png folder> <output.atlas> [--force]
+    import sys
+    args = [arg for arg in sys.argv[1:] if arg != '--force']
+    if len(args) != 2: sys.exit("usage: CheetahPacker.py <png folder> <output.atlas> [--force]")
+    print(packFolder(args[0], args[1], force='--force' in sys.argv))
@@ -0,0 +1,187 @@
+"""Binary sprite runtime format, usable without Blender"""
+
+# Little-endian, every section starts on a 4 byte boundary and holds one
+# primitive type, so a reader can mmap the file and cast each section to a
+# typed memoryview without copying.
+#
+#   header            HEADER, see below
+#   stringOffsets     u32[stringCount + 1], byte ranges into stringData
+#   stringData        utf-8 bytes, padded to 4
+#   frameNames        u32[frameCount], "atlas|frame" id string
+#   frameAtlases      u32[frameCount], atlas name string
+#   frameGeometry     f32[frameCount * 20], per frame:
+#                       quad x, z of the 4 face vertices (8)
+#                       quad u, v of the 4 face vertices (8)
+#                       bounds minX, minZ, maxX, maxZ (4)
+#   spriteNames       u32[spriteCount], object name string
+#   spriteFrames      i32[spriteCount], frame index or -1
+#   spriteParents     i32[spriteCount], parent sprite index or -1
+#   spriteTransforms  f32[spriteCount * 11], location (3), rotation (3),
+#                     scale (3), anchor point (2)
+#   timeline          i32[timelineLength * spriteCount], frame index per
+#                     sprite for timeline frames timelineFirst onwards, -1 = unchanged
+
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b'CHSP'
+VERSION = 1
+FRAME_FLOATS = 20
+SPRITE_FLOATS = 11
+SECTIONS = ('stringOffsets', 'stringData', 'frameNames', 'frameAtlases', 'frameGeometry',
+            'spriteNames', 'spriteFrames', 'spriteParents', 'spriteTransforms', 'timeline')
+# magic, version, reserved, timelineFirst, stringCount, frameCount, spriteCount, timelineLength, section offsets
+HEADER = struct.Struct('<4sHHiIIII' + 'I' * len(SECTIONS))
+
+class RuntimeFormatError(ValueError):
+    pass
+
+class RuntimeData:
+    """Everything written to a runtime file.
+
+    frames: (id, atlas name, 20 geometry floats)
+    sprites: (name, frame index, parent index, 11 transform floats)
+    timeline: flat frame indices, timelineLength rows of len(sprites)"""
+    def __init__(self, frames=(), sprites=(), timelineFirst=0, timeline=()):
+        self.frames = list(frames)
+        self.sprites = list(sprites)
+        self.timelineFirst = timelineFirst
+        self.timeline = list(timeline)
+
+def littleEndianBytes(typecode, values):
+    data = array(typecode, values)
+    if sys.byteorder != 'little': data.byteswap()
+    return data.tobytes()
+
+def pad4(data):
+    return data + b'\0' * (-len(data) % 4)
+
+def write(path, data):
+    spriteCount = len(data.sprites)
+    if spriteCount: timelineLength = len(data.timeline) // spriteCount
+    else: timelineLength = 0
+    if timelineLength * spriteCount != len(data.timeline):
+        raise RuntimeFormatError("timeline length is not a multiple of the sprite count")
+
+    strings = []
+    stringIndex = {}
+    def intern(value):
+        if value not in stringIndex:
+            stringIndex[value] = len(strings)
+            strings.append(value)
+        return stringIndex[value]
+
+    frameNames = [intern(frame[0]) for frame in data.frames]
+    frameAtlases = [intern(frame[1]) for frame in data.frames]
+    spriteNames = [intern(sprite[0]) for sprite in data.sprites]
+    frameGeometry = []
+    for frame in data.frames:
+        if len(frame[2]) != FRAME_FLOATS: raise RuntimeFormatError("frame %r needs %d floats" % (frame[0], FRAME_FLOATS))
+        frameGeometry.extend(frame[2])
+    spriteTransforms = []
+    for sprite in data.sprites:
+        if len(sprite[3]) != SPRITE_FLOATS: raise RuntimeFormatError("sprite %r needs %d floats" % (sprite[0], SPRITE_FLOATS))
+        spriteTransforms.extend(sprite[3])
+
+    encoded = [value.encode('utf-8') for value in strings]
+    stringOffsets = [0]
+    for value in encoded: stringOffsets.append(stringOffsets[-1] + len(value))
+
+    sections = [
+        littleEndianBytes('I', stringOffsets),
+        pad4(b''.join(encoded)),
+        littleEndianBytes('I', frameNames),
+        littleEndianBytes('I', frameAtlases),
+        littleEndianBytes('f', frameGeometry),
+        littleEndianBytes('I', spriteNames),
+        littleEndianBytes('i', [sprite[1] for sprite in data.sprites]),
+        littleEndianBytes('i', [sprite[2] for sprite in data.sprites]),
+        littleEndianBytes('f', spriteTransforms),
+        littleEndianBytes('i', data.timeline),
+    ]
+    offsets = []
+    offset = HEADER.size
+    for section in sections:
+        offsets.append(offset)
+        offset += len(section)
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, data.timelineFirst, len(strings), len(data.frames),
+                            spriteCount, timelineLength, *offsets))
+        for section in sections: f.write(section)
+
+class RuntimeFile:
+    """Memory mapped runtime file; sections are typed memoryviews into the map"""
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try: self.open(path)
+        except:
+            self.file.close()
+            raise
+
+    def open(self, path):
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < HEADER.size:
+            self.map.close()
+            raise RuntimeFormatError("%s: truncated header" % path)
+        fields = HEADER.unpack_from(self.map, 0)
+        magic, version = fields[0], fields[1]
+        if magic != MAGIC: raise RuntimeFormatError("%s: not a sprite runtime file" % path)
+        if version != VERSION: raise RuntimeFormatError("%s: unsupported version %d" % (path, version))
+        self.timelineFirst, stringCount, self.frameCount, self.spriteCount, self.timelineLength = fields[3:8]
+        offsets = dict(zip(SECTIONS, fields[8:]))
+
+        self.stringOffsets = self.view(offsets['stringOffsets'], 'I', stringCount + 1)
+        self.stringData = memoryview(self.map)[offsets['stringData']:offsets['frameNames']]
+        self.frameNames = self.view(offsets['frameNames'], 'I', self.frameCount)
+        self.frameAtlases = self.view(offsets['frameAtlases'], 'I', self.frameCount)
+        self.frameGeometry = self.view(offsets['frameGeometry'], 'f', self.frameCount * FRAME_FLOATS)
+        self.spriteNames = self.view(offsets['spriteNames'], 'I', self.spriteCount)
+        self.spriteFrames = self.view(offsets['spriteFrames'], 'i', self.spriteCount)
+        self.spriteParents = self.view(offsets['spriteParents'], 'i', self.spriteCount)
+        self.spriteTransforms = self.view(offsets['spriteTransforms'], 'f', self.spriteCount * SPRITE_FLOATS)
+        self.timeline = self.view(offsets['timeline'], 'i', self.timelineLength * self.spriteCount)
+
+    def view(self, offset, typecode, count):
+        end = offset + count * 4
+        if end > len(self.map): raise RuntimeFormatError("section at %d runs past the end of the file" % offset)
+        if sys.byteorder == 'little': return memoryview(self.map)[offset:end].cast(typecode)
+        # big-endian hosts pay for a copy
+        data = array(typecode, self.map[offset:end])
+        data.byteswap()
+        return memoryview(data)
+
+    def string(self, index):
+        return bytes(self.stringData[self.stringOffsets[index]:self.stringOffsets[index + 1]]).decode('utf-8')
+
+    def frame(self, index):
+        return (self.string(self.frameNames[index]), self.string(self.frameAtlases[index]),
+                list(self.frameGeometry[index * FRAME_FLOATS:(index + 1) * FRAME_FLOATS]))
+
+    def sprite(self, index):
+        return (self.string(self.spriteNames[index]), self.spriteFrames[index], self.spriteParents[index],
+                list(self.spriteTransforms[index * SPRITE_FLOATS:(index + 1) * SPRITE_FLOATS]))
+
+    def timelineRow(self, frame):
+        row = (frame - self.timelineFirst) * self.spriteCount
+        return self.timeline[row:row + self.spriteCount]
+
+    def read(self):
+        """Copy everything back into a RuntimeData"""
+        return RuntimeData([self.frame(i) for i in range(self.frameCount)],
+                           [self.sprite(i) for i in range(self.spriteCount)],
+                           self.timelineFirst, list(self.timeline))
+
+    def close(self):
+        # views must go before the map can close
+        for name in SECTIONS: getattr(self, name).release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,433 @@
+# Performance benchmarks for CheetahAtlasImporter.
+#
+# Run inside Blender:
+#   blender --background --factory-startup --python benchmarks/CheetahBenchmarks.py -- [options] [name ...]
+# Run under plain CPython against the bpy stand-in in benchmarks/fakebpy:
+#   python benchmarks/CheetahBenchmarks.py --fake [options] [name ...]
+# Without --fake, plain Python only runs the benchmarks that do not touch
+# Blender data.
+#
+# Options:
+#   --json PATH      write all results to PATH
+#   --compare PATH   print each result next to the same result in an older --json file
+#
+# Without names every available benchmark runs. Each benchmark prints one
+# line per measured size so results can be compared between commits.
+
+import os
+import sys
+import tempfile
+import time
+import json
+import platform
+import subprocess
+
+benchmarkDirectory = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(benchmarkDirectory))
+
+if '--' in sys.argv: argv = sys.argv[sys.argv.index('--') + 1:]
+else: argv = sys.argv[1:]
+fake = '--fake' in argv
+if fake: sys.path.insert(0, os.path.join(benchmarkDirectory, 'fakebpy'))
+
+import CheetahAtlas
+import CheetahPacker
+
+try:
+    import bpy
+    import CheetahAtlasImporter as cheetah
+except ImportError:
+    bpy = None
+
+benchmarks = {}
+pureBenchmarks = set()
+results = []
+
+def benchmark(func):
+    benchmarks[func.__name__] = func
+    return func
+
+def pureBenchmark(func):
+    pureBenchmarks.add(func.__name__)
+    return benchmark(func)
+
+def record(name, metric, value, unit, **params):
+    """Print one result line and keep it for --json"""
+    results.append({'benchmark': name, 'metric': metric, 'params': params, 'value': value, 'unit': unit})
+    print('%s %s%s %.3f %s' % (name, ''.join('%s=%s ' % item for item in sorted(params.items())), metric, value, unit))
+
+def resultKey(result):
+    return (result['benchmark'], result['metric'], tuple(sorted(result['params'].items())))
+
+def environment():
+    try: commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=benchmarkDirectory, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError): commit = None
+    return {
+        'commit': commit,
+        'bpy': None if bpy is None else bpy.app.version_string,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+
+def compareResults(path):
+    with open(path, 'r', encoding='utf-8') as f: old = json.load(f)
+    oldResults = dict((resultKey(result), result) for result in old['results'])
+    print('compared with %s (commit %s)' % (path, old['environment'].get('commit')))
+    for result in results:
+        before = oldResults.get(resultKey(result))
+        if before is None or not before['value']: continue
+        print('%s %s%s %.3f -> %.3f %s (x%.2f)' % (result['benchmark'], ''.join('%s=%s ' % item for item in sorted(result['params'].items())),
+              result['metric'], before['value'], result['value'], result['unit'], result['value'] / before['value']))
+
+def timeit(func, repeat):
+    start = time.perf_counter()
+    for i in range(repeat): func()
+    return (time.perf_counter() - start) / repeat
+
+def makeAtlasHierarchy(atlasName, frameCount):
+    # frame lookups only depend on the atlases -> atlas -> frame parenting
+    # and the 'name' ID properties, so plain empties are enough here
+    if 'atlases' in bpy.data.objects: atlases = bpy.data.objects['atlases']
+    else:
+        atlases = bpy.data.objects.new('atlases', None)
+        bpy.context.scene.objects.link(atlases)
+    atlas = bpy.data.objects.new(atlasName, None)
+    bpy.context.scene.objects.link(atlas)
+    atlas.parent = atlases
+    atlas['name'] = atlasName
+    for i in range(frameCount):
+        frame = bpy.data.objects.new('%s_%d' % (atlasName, i), None)
+        bpy.context.scene.objects.link(frame)
+        frame.parent = atlas
+        frame['name'] = 'frame%d' % i
+    return atlas
+
+def writeSyntheticAtlas(directory, name, frameCount, rotatedEvery=3):
+    # 64x64 cells on a square sheet, every third frame packed rotated
+    columns = max(1, int(frameCount ** 0.5))
+    size = columns * 64
+    path = os.path.join(directory, name + '.atlas')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('textures: %s.png\n' % name)
+        for i in range(frameCount):
+            x = (i % columns) * 64
+            y = (i // columns) * 64 % size
+            rotated = '\tr' if i % rotatedEvery == 0 else ''
+            f.write('frame%d\t%d\t%d\t60\t50\t2\t7\t64\t64%s\n' % (i, x, y, rotated))
+    # an empty sheet, import only reads its size
+    CheetahPacker.writePng(os.path.join(directory, name + '.png'), size, size, bytes(size * size * 4))
+    return path
+
+def importSyntheticAtlas(name, frameCount):
+    """Write and import a synthetic atlas, returns its atlas name ("<name>.atlas")"""
+    directory = tempfile.mkdtemp()
+    path = writeSyntheticAtlas(directory, name, frameCount)
+    # atlas names are relative to the scene root path
+    bpy.context.scene.cheetah_relpath = directory
+    bpy.ops.cheetah.atlas_import(filepath=path)
+    return cheetah.findAtlas(name + '.atlas')['name']
+
+def clearScene():
+    for ob in list(bpy.data.objects):
+        bpy.data.objects.remove(ob, do_unlink=True)
+    cheetah.invalidateFrameCache()
+    cheetah.drivers.clear()
+
+def makeSprite(name):
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata([(0, 0, 0)] * 6, [], [[0, 1, 2, 3]])
+    mesh.uv_textures.new()
+    sprite = bpy.data.objects.new(name, mesh)
+    bpy.context.scene.objects.link(sprite)
+    return sprite
+
+def makeDriver(sprite, frameId):
+    driver = bpy.data.objects.new('Driver', None)
+    bpy.context.scene.objects.link(driver)
+    driver['driver'] = True
+    driver['frame'] = frameId
+    driver['enabled'] = False
+    driver.parent = sprite
+    cheetah.registerDriver(driver)
+    return driver
+
+@benchmark
+def frameLookup():
+    for size in (10, 100, 1000, 10000):
+        clearScene()
+        makeAtlasHierarchy('atlas', size)
+        ids = ['atlas|frame%d' % i for i in range(0, size, max(1, size // 100))]
+        cheetah.getFrameObjectById(ids[0]) # fill the index
+        perLookup = timeit(lambda: [cheetah.getFrameObjectById(id) for id in ids], 100) / len(ids)
+        record('frameLookup', 'lookup', perLookup * 1e6, 'us', frames=size)
+
+@benchmark
+def frameHandler():
+    # a fixed number of drivers while the rest of the scene grows
+    for size in (100, 1000, 10000, 50000):
+        clearScene()
+        makeAtlasHierarchy('atlas', 2)
+        for i in range(size):
+            bpy.context.scene.objects.link(bpy.data.objects.new('filler%d' % i, None))
+        for i in range(10): makeDriver(makeSprite('sprite%d' % i), 'atlas|frame0')
+        # the first call rescans, the object count changed since the last registry build
+        cheetah.preFrameHandler(bpy.context.scene)
+        perFrame = timeit(lambda: cheetah.preFrameHandler(bpy.context.scene), 100)
+        record('frameHandler', 'frame', perFrame * 1e3, 'ms', objects=size, drivers=10)
+
+@benchmark
+def atlasImport():
+    directory = tempfile.mkdtemp()
+    for size in (100, 500, 2000):
+        for batched in (False, True):
+            clearScene()
+            path = writeSyntheticAtlas(directory, 'import%d' % size, size)
+            start = time.perf_counter()
+            bpy.ops.cheetah.atlas_import(filepath=path, batched=batched)
+            elapsed = time.perf_counter() - start
+            record('atlasImport', 'rate', size / elapsed, 'frames/s', frames=size, batched=batched)
+
+@benchmark
+def frameSwap():
+    clearScene()
+    atlasName = importSyntheticAtlas('swap', 64)
+    sprite = makeSprite('sprite')
+    cheetah.persistAnchorPoint(sprite, (0.5, 0.5))
+    ids = [atlasName + '|frame%d' % i for i in range(64)]
+    count = 10000
+    start = time.perf_counter()
+    for i in range(count): cheetah.setSpriteFrameById(sprite, ids[i % 64])
+    record('frameSwap', 'changing', count / (time.perf_counter() - start), 'swaps/s')
+    assert sprite['sprite'] == ids[(count - 1) % 64], "frame ids did not resolve"
+    start = time.perf_counter()
+    for i in range(count): cheetah.setSpriteFrameById(sprite, ids[0])
+    record('frameSwap', 'unchanged', count / (time.perf_counter() - start), 'swaps/s')
+    frames = [cheetah.getFrameObjectById(id) for id in ids]
+    start = time.perf_counter()
+    for i in range(count): cheetah.setSpriteFrame(frames[i % 64], sprite)
+    record('frameSwap', 'fromObject', count / (time.perf_counter() - start), 'swaps/s')
+
+@benchmark
+def spriteCreate():
+    for size in (100, 1000, 5000):
+        clearScene()
+        atlasName = importSyntheticAtlas('sprites', 64)
+        entries = cheetah.gridLayout([atlasName + '|frame%d' % (i % 64) for i in range(size)], (0, 0, 0), 50, (1, 1))
+        start = time.perf_counter()
+        cheetah.createSprites(bpy.context, entries)
+        record('spriteCreate', 'rate', size / (time.perf_counter() - start), 'sprites/s', sprites=size)
+
+@benchmark
+def meshCreate():
+    # one BMesh round-trip per frame against the preallocated foreach_set quad
+    frame = CheetahAtlas.Frame('frame', 0, 0, 60, 50, 2, 7, 64, 64, True)
+    verts, uvs = cheetah.frameGeometry(frame, 0.01, 1024, 1024)
+    flatVerts = [c for v in verts for c in v]
+    flatUvs = [c for uv in uvs for c in uv]
+    for size in (100, 1000):
+        clearScene()
+        mat = bpy.data.materials.new('meshCreate')
+        start = time.perf_counter()
+        for i in range(size): cheetah.createMesh('frame', [cheetah.Vector(v) for v in verts], [cheetah.Vector(uv) for uv in uvs], None, mat, None)
+        record('meshCreate', 'bmesh', size / (time.perf_counter() - start), 'meshes/s', meshes=size)
+        start = time.perf_counter()
+        for i in range(size): cheetah.newQuadMesh('frame', flatVerts, flatUvs)
+        record('meshCreate', 'quad', size / (time.perf_counter() - start), 'meshes/s', meshes=size)
+
+@benchmark
+def anchorSet():
+    for size in (100, 1000):
+        clearScene()
+        atlasName = importSyntheticAtlas('anchor', 64)
+        entries = cheetah.gridLayout([atlasName + '|frame%d' % (i % 64) for i in range(size)], (0, 0, 0), 50, (1, 1))
+        sprites = cheetah.createSprites(bpy.context, entries)
+        start = time.perf_counter()
+        for i, sprite in enumerate(sprites): cheetah.setSpriteAnchorPoint(sprite, (0.25 * (i % 4), 0.5))
+        record('anchorSet', 'stored', size / (time.perf_counter() - start), 'sprites/s', sprites=size)
+        start = time.perf_counter()
+        for sprite in sprites: cheetah.setAnchorPoint(sprite, (0.5, 0.5))
+        record('anchorSet', 'scan', size / (time.perf_counter() - start), 'sprites/s', sprites=size)
+
+@benchmark
+def enumItems():
+    for size in (100, 1000, 10000):
+        clearScene()
+        for i in range(10): makeAtlasHierarchy('atlas%d' % i, size // 10)
+        cheetah.bumpItemsVersion()
+        start = time.perf_counter()
+        cheetah.getAtlasItems(None, bpy.context)
+        record('enumItems', 'rebuild', (time.perf_counter() - start) * 1e3, 'ms', frames=size)
+        perCall = timeit(lambda: cheetah.getAtlasItems(None, bpy.context), 1000)
+        record('enumItems', 'cached', perCall * 1e6, 'us', frames=size)
+
+@benchmark
+def frameHandlerDrivers():
+    # playback with a growing number of drivers, every driver swaps once per frame
+    for size in (10, 100, 1000):
+        clearScene()
+        atlasName = importSyntheticAtlas('play', 64)
+        for i in range(size):
+            sprite = makeSprite('sprite%d' % i)
+            for frame in (0, 1):
+                driver = makeDriver(sprite, atlasName + '|frame%d' % ((i + frame) % 64))
+                driver.location[2] = 2.0 if frame else 0.0
+        drivers = list(cheetah.drivers)
+        def step():
+            for driver in drivers:
+                driver.location[2] = 2.0 - driver.location[2]
+                driver['enabled'] = False
+            cheetah.preFrameHandler(bpy.context.scene)
+        perFrame = timeit(step, 20)
+        record('frameHandlerDrivers', 'frame', perFrame * 1e3, 'ms', drivers=size * 2)
+
+@benchmark
+def meshSwap():
+    # 1000 animated sprites, every sprite shows the next frame on every step
+    size = 1000
+    for shared in (False, True):
+        clearScene()
+        atlasName = importSyntheticAtlas('crowd', 64)
+        ids = [atlasName + '|frame%d' % i for i in range(64)]
+        entries = cheetah.gridLayout([ids[i % 64] for i in range(size)], (0, 0, 0), 50, (1, 1))
+        sprites = cheetah.createSprites(bpy.context, entries, shared=shared)
+        state = [0]
+        def step():
+            state[0] += 1
+            for i, sprite in enumerate(sprites): cheetah.setSpriteFrameById(sprite, ids[(i + state[0]) % 64])
+        step() # creates the shared meshes
+        perFrame = timeit(step, 20)
+        assert sprites[0]['sprite'] == ids[state[0] % 64], "frame ids did not resolve"
+        record('meshSwap', 'frame', perFrame * 1e3, 'ms', sprites=size, shared=shared)
+        record('meshSwap', 'meshes', len(set(sprite.data for sprite in sprites)), 'meshes', sprites=size, shared=shared)
+    for sprite in sprites: cheetah.setSpriteMeshMode(sprite, False)
+    start = time.perf_counter()
+    purged = cheetah.purgeSharedMeshes()
+    record('meshSwap', 'purge', (time.perf_counter() - start) * 1e3, 'ms', sprites=size, meshes=purged)
+
+@benchmark
+def staticBatch():
+    # 1000 sprites without drivers on one atlas, batched into a single mesh and back
+    size = 1000
+    clearScene()
+    atlasName = importSyntheticAtlas('props', 64)
+    ids = [atlasName + '|frame%d' % i for i in range(64)]
+    entries = cheetah.gridLayout([ids[i % 64] for i in range(size)], (0, 0, 0), 50, (1, 1))
+    sprites = cheetah.createSprites(bpy.context, entries)
+    scene = bpy.context.scene
+    # one sprite under a moved parent, one under an animated parent
+    holder = bpy.data.objects.new('holder', None)
+    scene.objects.link(holder)
+    holder.location = (5.0, 0.0, 0.0)
+    sprites[1].parent = holder
+    animated = bpy.data.objects.new('animated', None)
+    scene.objects.link(animated)
+    animated.animation_data_create().action = bpy.data.actions.new('animatedAction')
+    sprites[2].parent = animated
+    objectsBefore = len(scene.objects)
+    start = time.perf_counter()
+    groups = cheetah.findStaticSprites(scene)
+    batches = [cheetah.batchSprites(bpy.context, mat, group) for mat, group in groups.items()]
+    record('staticBatch', 'batch', (time.perf_counter() - start) * 1e3, 'ms', sprites=size)
+    record('staticBatch', 'objects', len(scene.objects), 'objects', sprites=size, before=objectsBefore)
+    assert sprites[2].name in scene.objects and sprites[1].name not in scene.objects, "batched the wrong sprites"
+    start = time.perf_counter()
+    restored = sum(len(cheetah.unbatchSprites(bpy.context, batch)) for batch in batches)
+    record('staticBatch', 'unbatch', (time.perf_counter() - start) * 1e3, 'ms', sprites=size)
+    assert restored == size - 1 and len(scene.objects) == objectsBefore, "unbatch lost sprites"
+    assert all(abs(a - b) < 1e-4 for a, b in zip(sprites[1].location, entries[1][1])), "unbatch moved a sprite"
+
+@benchmark
+def frameUsage():
+    # 5000 frame objects of which 1 in 10 is shown by a sprite
+    size = 5000
+    clearScene()
+    atlasName = importSyntheticAtlas('scenery', size)
+    ids = [atlasName + '|frame%d' % i for i in range(size)]
+    cheetah.createSprites(bpy.context, cheetah.gridLayout(ids[::10], (0, 0, 0), 50, (1, 1)))
+    start = time.perf_counter()
+    used, frameObs = cheetah.collectFrameUsage()
+    record('frameUsage', 'analyze', (time.perf_counter() - start) * 1e3, 'ms', frames=size)
+    atlas, obs = next(iter(frameObs.items()))
+    unused = [ob for ob in obs if atlasName + '|' + ob['name'] not in used]
+    objectsBefore = len(bpy.data.objects)
+    start = time.perf_counter()
+    cheetah.stubFrameObjects(atlas, unused)
+    record('frameUsage', 'stub', (time.perf_counter() - start) * 1e3, 'ms', frames=len(unused))
+    record('frameUsage', 'objects', len(bpy.data.objects), 'objects', before=objectsBefore)
+    cheetah.invalidateFrameCache()
+    assert cheetah.getFrameData(ids[1], False) is not None, "stubbed frame did not resolve"
+    start = time.perf_counter()
+    cheetah.restoreFrameStubs(atlas)
+    record('frameUsage', 'restore', (time.perf_counter() - start) * 1e3, 'ms', frames=len(unused))
+    assert len(bpy.data.objects) == objectsBefore, "restore lost frames"
+    # patterns count every id they can format, whatever the conversion
+    for pattern in ('a|f%s', 'a|f%5d', 'a|f%-4d%%', 'a|f%#06x', 'a|f%o'):
+        regex = cheetah.patternRegex(pattern)
+        assert all(regex.match(pattern % n) for n in (-12, 0, 7, 12345)), "%s missed an id" % pattern
+        assert not regex.match('a|g1'), "%s matched a foreign id" % pattern
+    try: cheetah.patternRegex('a|f%c')
+    except ValueError: pass
+    else: raise AssertionError("a|f%c was not refused")
+
+def writeAtlasLines(path, frameCount):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('textures: synthetic.png\n')
+        for i in range(frameCount):
+            rotated = '\tr' if i % 3 == 0 else ''
+            f.write('character/walk_%05d\t%d\t%d\t60\t50\t2\t7\t64\t64%s\n' % (i, i % 4096, i // 4096, rotated))
+
+@pureBenchmark
+def atlasParse():
+    path = os.path.join(tempfile.mkdtemp(), 'parse.atlas')
+    writeAtlasLines(path, 100000)
+    start = time.perf_counter()
+    CheetahAtlas.parseAtlas(path)
+    elapsed = time.perf_counter() - start
+    record('atlasParse', 'rate', 100000 / elapsed, 'lines/s', lines=100000)
+    start = time.perf_counter()
+    CheetahAtlas.parseAtlas(path)
+    record('atlasParse', 'cached', (time.perf_counter() - start) * 1e3, 'ms', lines=100000)
+
+def writeFramePngs(directory, count):
+    # 64x64 frames with a differently sized opaque box, so every frame trims
+    for i in range(count):
+        w, h = 8 + (i * 7) % 50, 8 + (i * 13) % 50
+        row = b'\0\0\0\0' * 4 + b'\x80\x40\x20\xff' * w + b'\0\0\0\0' * (60 - w)
+        pixels = b'\0' * (64 * 4 * 2) + row * h + b'\0' * (64 * 4 * (62 - h))
+        CheetahPacker.writePng(os.path.join(directory, 'walk_%04d.png' % i), 64, 64, pixels)
+
+@pureBenchmark
+def atlasPack():
+    for size in (100, 500):
+        directory = tempfile.mkdtemp()
+        frames = os.path.join(directory, 'frames')
+        os.mkdir(frames)
+        writeFramePngs(frames, size)
+        atlasPath = os.path.join(directory, 'packed.atlas')
+        result = CheetahPacker.packFolder(frames, atlasPath)
+        record('atlasPack', 'full', result.elapsed * 1e3, 'ms', frames=size)
+        record('atlasPack', 'efficiency', result.efficiency * 100, '%', frames=size)
+        os.utime(os.path.join(frames, 'walk_0000.png'), (0, 0))
+        result = CheetahPacker.packFolder(frames, atlasPath)
+        record('atlasPack', 'oneChanged', result.elapsed * 1e3, 'ms', frames=size)
+        result = CheetahPacker.packFolder(frames, atlasPath)
+        record('atlasPack', 'unchanged', result.elapsed * 1e3, 'ms', frames=size)
+
+if __name__ == "__main__":
+    options = {}
+    names = []
+    args = iter(argv)
+    for arg in args:
+        if arg in ('--json', '--compare'): options[arg] = next(args)
+        elif arg != '--fake': names.append(arg)
+    if bpy is None: available = sorted(pureBenchmarks)
+    else:
+        cheetah.register()
+        available = sorted(benchmarks)
+    for name in names or available:
+        benchmarks[name]()
+    if '--json' in options:
+        with open(options['--json'], 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=1)
+    if '--compare' in options: compareResults(options['--compare'])
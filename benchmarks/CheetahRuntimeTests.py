@@ -0,0 +1,101 @@
+# Checks for the sprite runtime format (CheetahRuntimeFormat) and its export.
+#
+#   python benchmarks/CheetahRuntimeTests.py          format round trips only
+#   python benchmarks/CheetahRuntimeTests.py --fake   also export from the bpy stand-in in benchmarks/fakebpy
+
+import os
+import sys
+import tempfile
+import unittest
+
+benchmarkDirectory = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(benchmarkDirectory))
+fake = '--fake' in sys.argv
+if fake:
+    sys.argv.remove('--fake')
+    sys.path.insert(0, os.path.join(benchmarkDirectory, 'fakebpy'))
+
+import CheetahRuntimeFormat as runtime
+
+try:
+    import bpy
+    import CheetahAtlasImporter as cheetah
+    import CheetahBenchmarks
+except ImportError:
+    bpy = None
+
+class TemporaryFile(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.chsp')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+class RoundTrip(TemporaryFile):
+    def testRoundTrip(self):
+        geometry = [float(i) / 4 for i in range(runtime.FRAME_FLOATS)]
+        transform = [float(i) / 2 for i in range(runtime.SPRITE_FLOATS)]
+        data = runtime.RuntimeData(
+            frames=[('hero.atlas|walk_0001', 'hero.atlas', geometry), ('hero.atlas|wälk_0002', 'hero.atlas', geometry[::-1])],
+            sprites=[('hero', 0, -1, transform), ('shadow', -1, 0, transform[::-1]), ('fx', 1, 0, transform)],
+            timelineFirst=-2,
+            timeline=[0, -1, 1, 1, -1, 0])
+        runtime.write(self.path, data)
+        with runtime.RuntimeFile(self.path) as f:
+            result = f.read()
+            self.assertEqual(f.timelineRow(-1).tolist(), [1, -1, 0])
+        self.assertEqual(result.frames, data.frames)
+        self.assertEqual(result.sprites, data.sprites)
+        self.assertEqual(result.timelineFirst, data.timelineFirst)
+        self.assertEqual(result.timeline, data.timeline)
+
+    def testEmpty(self):
+        runtime.write(self.path, runtime.RuntimeData())
+        with runtime.RuntimeFile(self.path) as f: result = f.read()
+        self.assertEqual((result.frames, result.sprites, result.timeline), ([], [], []))
+
+    def testRaggedTimeline(self):
+        sprites = [('a', -1, -1, [0.0] * runtime.SPRITE_FLOATS)] * 2
+        with self.assertRaises(runtime.RuntimeFormatError):
+            runtime.write(self.path, runtime.RuntimeData(sprites=sprites, timeline=[0, 0, 0]))
+
+    def testNotRuntimeFile(self):
+        with open(self.path, 'wb') as f: f.write(b'\0' * runtime.HEADER.size)
+        with self.assertRaises(runtime.RuntimeFormatError): runtime.RuntimeFile(self.path)
+
+@unittest.skipIf(bpy is None, "needs Blender or --fake")
+class Export(TemporaryFile):
+    def testExport(self):
+        CheetahBenchmarks.clearScene()
+        scene = bpy.context.scene
+        atlasName = CheetahBenchmarks.importSyntheticAtlas('export', 4)
+        holder = bpy.data.objects.new('holder', None)
+        scene.objects.link(holder)
+        holder.location = (5.0, 0.0, 0.0)
+        sprite, child = cheetah.createSprites(bpy.context, [(atlasName + '|frame1', (1.0, 0.0, 0.0), (0.5, 0.5)),
+                                                            (atlasName + '|frame2', (3.0, 0.0, 2.0), (0.0, 0.0))])
+        sprite.parent = holder
+        child.parent = sprite
+        child.location = (2.0, 0.0, 2.0)
+        
+        bpy.ops.cheetah.export_runtime(filepath=self.path)
+        with runtime.RuntimeFile(self.path) as f: result = f.read()
+        sprites = dict((record[0], record) for record in result.sprites)
+        frameIds = [frame[0] for frame in result.frames]
+        
+        exported = sprites[sprite.name]
+        self.assertEqual(frameIds[exported[1]], atlasName + '|frame1')
+        # the non-sprite parent is folded into the world transform
+        self.assertEqual(exported[2], -1)
+        self.assertEqual(exported[3][0:3], [6.0, 0.0, 0.0])
+        self.assertEqual(exported[3][9:11], [0.5, 0.5])
+        
+        exported = sprites[child.name]
+        self.assertEqual(frameIds[exported[1]], atlasName + '|frame2')
+        self.assertEqual(result.sprites[exported[2]][0], sprite.name)
+        self.assertEqual(exported[3][0:3], [2.0, 0.0, 2.0])
+
+if __name__ == "__main__":
+    if bpy is not None: cheetah.register()
+    unittest.main()
@@ -0,0 +1,71 @@
+# Minimal stand-in for Blender's bmesh: enough for the add-on's UV
+# assignment through a BMesh (CheetahAtlasImporter.createMesh)
+
+from mathutils import Vector
+
+class BMVert:
+    def __init__(self, index, co):
+        self.index = index
+        self.co = Vector(co)
+
+class BMLoop:
+    def __init__(self, vert, uv):
+        self.vert = vert
+        self.layers = {'uv': uv}
+
+    def __getitem__(self, layer):
+        return self.layers[layer]
+
+class BMLoopUV:
+    def __init__(self, uv):
+        self.uv = Vector(uv)
+
+class BMFace:
+    def __init__(self, loops):
+        self.loops = loops
+
+class LayerAccess:
+    def __init__(self, name):
+        self.name = name
+
+    def verify(self):
+        return self.name
+
+class BMLayers:
+    def __init__(self, *names):
+        for name in names: setattr(self, name, LayerAccess(name))
+
+class BMSequence(list):
+    def __init__(self, *layerNames):
+        list.__init__(self)
+        self.layers = BMLayers(*layerNames)
+
+class BMesh:
+    def __init__(self):
+        self.verts = BMSequence()
+        self.faces = BMSequence('tex')
+        self.loops = BMSequence('uv')
+
+    def from_mesh(self, mesh):
+        co = mesh.vertices.co
+        self.verts.extend(BMVert(i, co[i * 3:i * 3 + 3]) for i in range(len(mesh.vertices)))
+        indices = mesh.loops.attrs['vertex_index']
+        uvs = mesh.uv_layers[0].data.uv if mesh.uv_layers else [0.0] * (len(indices) * 2)
+        starts = mesh.polygons.attrs['loop_start']
+        totals = mesh.polygons.attrs['loop_total']
+        for start, total in zip(starts, totals):
+            loops = [BMLoop(self.verts[indices[i]], BMLoopUV(uvs[i * 2:i * 2 + 2])) for i in range(start, start + total)]
+            self.faces.append(BMFace(loops))
+
+    def to_mesh(self, mesh):
+        if not mesh.uv_textures: mesh.uv_textures.new()
+        uvs = []
+        for face in self.faces:
+            for loop in face.loops: uvs.extend(loop['uv'].uv)
+        mesh.uv_layers[0].data.foreach_set('uv', uvs)
+
+    def free(self):
+        del self.verts[:], self.faces[:]
+
+def new():
+    return BMesh()
@@ -0,0 +1,648 @@
+# Minimal stand-in for Blender's bpy so the benchmarks run under plain
+# CPython. It models just the data the add-on touches: objects with ID
+# properties and parenting, quad meshes with foreach_get/foreach_set,
+# materials, textures, images, one scene, the handler lists and operator
+# registration. Timings taken against it measure the add-on's Python side
+# only; compare them between commits, not against a real Blender.
+
+import os
+import struct
+import sys
+from types import ModuleType
+
+from mathutils import Vector, Matrix
+
+def submodule(name):
+    module = ModuleType('bpy.' + name)
+    sys.modules['bpy.' + name] = module
+    globals()[name] = module
+    return module
+
+############ ID data
+
+class IDPropertyArray(list):
+    def to_list(self):
+        return list(self)
+
+class ID:
+    def __init__(self, name):
+        self.name = name
+        self.idProperties = {}
+        self.users = 0
+        self.use_fake_user = False
+
+    def __getitem__(self, key):
+        return self.idProperties[key]
+
+    def __setitem__(self, key, value):
+        if isinstance(value, (list, tuple)) and all(isinstance(v, (int, float)) for v in value):
+            value = IDPropertyArray(value)
+        self.idProperties[key] = value
+
+    def __delitem__(self, key):
+        del self.idProperties[key]
+
+    def __contains__(self, key):
+        return key in self.idProperties
+
+    def get(self, key, default=None):
+        return self.idProperties.get(key, default)
+
+    def keys(self):
+        return self.idProperties.keys()
+
+class Collection:
+    """bpy.data collection: ordered, unique names, lookup by name or index"""
+    def __init__(self, factory):
+        self.factory = factory
+        self.items = {}
+        self.suffixes = {}
+
+    def uniqueName(self, name):
+        if name not in self.items: return name
+        suffix = self.suffixes.get(name, 0)
+        while True:
+            suffix += 1
+            candidate = '%s.%03d' % (name, suffix)
+            if candidate not in self.items: break
+        self.suffixes[name] = suffix
+        return candidate
+
+    def add(self, item):
+        item.name = self.uniqueName(item.name)
+        item.collection = self
+        self.items[item.name] = item
+        return item
+
+    def new(self, name, *args, **kwargs):
+        return self.add(self.factory(name, *args, **kwargs))
+
+    def rename(self, item, name):
+        del self.items[item.name]
+        item.__dict__['name'] = self.uniqueName(name)
+        self.items[item.name] = item
+
+    def remove(self, item, do_unlink=False):
+        del self.items[item.name]
+        # children keep their parent pointer, the benchmarks only remove whole scenes
+        if isinstance(item, Object):
+            if item.users: context.scene.objects.unlink(item)
+            item.data = None
+
+    def __iter__(self):
+        return iter(list(self.items.values()))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, name):
+        return name in self.items
+
+    def __getitem__(self, key):
+        if isinstance(key, int): return list(self.items.values())[key]
+        return self.items[key]
+
+    def get(self, name, default=None):
+        return self.items.get(name, default)
+
+class NamedID(ID):
+    """ID whose name stays unique inside its collection when renamed"""
+    collection = None
+
+    def __setattr__(self, key, value):
+        if key == 'name' and self.collection is not None: self.collection.rename(self, value)
+        else: object.__setattr__(self, key, value)
+
+############ meshes
+
+class CoView:
+    """Writable 3 float view into a vertex array"""
+    __slots__ = ('data', 'offset')
+
+    def __init__(self, data, offset):
+        self.data = data
+        self.offset = offset
+
+    def __getitem__(self, i):
+        return self.data[self.offset + i]
+
+    def __setitem__(self, i, value):
+        self.data[self.offset + i] = value
+
+    def __iter__(self):
+        return iter(self.data[self.offset:self.offset + 3])
+
+class MeshVertex:
+    __slots__ = ('vertices', 'index')
+
+    def __init__(self, vertices, index):
+        self.vertices = vertices
+        self.index = index
+
+    @property
+    def co(self):
+        return CoView(self.vertices.co, self.index * 3)
+
+    @co.setter
+    def co(self, value):
+        self.vertices.co[self.index * 3:self.index * 3 + 3] = [float(v) for v in value]
+
+def foreachSet(target, seq, width, name):
+    values = [float(v) for v in seq]
+    if len(values) != len(target): raise RuntimeError("foreach_set('%s'): expected %d values, got %d" % (name, len(target), len(values)))
+    target[:] = values
+
+def foreachGet(source, seq, name):
+    if len(seq) != len(source): raise RuntimeError("foreach_get('%s'): expected %d values, got %d" % (name, len(source), len(seq)))
+    seq[:] = source
+
+class MeshVertices:
+    def __init__(self):
+        self.co = []
+
+    def add(self, count):
+        self.co.extend([0.0] * (count * 3))
+
+    def foreach_set(self, attr, seq):
+        foreachSet(self.co, seq, 3, attr)
+
+    def foreach_get(self, attr, seq):
+        foreachGet(self.co, seq, attr)
+
+    def __len__(self):
+        return len(self.co) // 3
+
+    def __iter__(self):
+        return (MeshVertex(self, i) for i in range(len(self)))
+
+    def __getitem__(self, i):
+        return MeshVertex(self, i)
+
+class IntArray:
+    def __init__(self, attrs):
+        self.attrs = dict((attr, []) for attr in attrs)
+
+    def add(self, count):
+        for values in self.attrs.values(): values.extend([0] * count)
+
+    def foreach_set(self, attr, seq):
+        values = [int(v) for v in seq]
+        if len(values) != len(self.attrs[attr]): raise RuntimeError("foreach_set('%s'): wrong length" % attr)
+        self.attrs[attr][:] = values
+
+    def foreach_get(self, attr, seq):
+        foreachGet(self.attrs[attr], seq, attr)
+
+    def __len__(self):
+        return len(next(iter(self.attrs.values())))
+
+class UVLoop:
+    __slots__ = ('layer', 'index')
+
+    def __init__(self, layer, index):
+        self.layer = layer
+        self.index = index
+
+    @property
+    def uv(self):
+        return Vector(self.layer.uv[self.index * 2:self.index * 2 + 2])
+
+    @uv.setter
+    def uv(self, value):
+        self.layer.uv[self.index * 2:self.index * 2 + 2] = [float(v) for v in value]
+
+class UVLayerData:
+    def __init__(self, loopCount):
+        self.uv = [0.0] * (loopCount * 2)
+
+    def foreach_set(self, attr, seq):
+        foreachSet(self.uv, seq, 2, attr)
+
+    def foreach_get(self, attr, seq):
+        foreachGet(self.uv, seq, attr)
+
+    def __len__(self):
+        return len(self.uv) // 2
+
+    def __getitem__(self, i):
+        return UVLoop(self, i)
+
+class UVLayer:
+    def __init__(self, name, loopCount):
+        self.name = name
+        self.data = UVLayerData(loopCount)
+
+class TexFace:
+    __slots__ = ('image',)
+
+    def __init__(self):
+        self.image = None
+
+class UVTexture:
+    def __init__(self, name, polygonCount):
+        self.name = name
+        self.data = [TexFace() for i in range(polygonCount)]
+
+class LayerList(list):
+    @property
+    def active(self):
+        return self[0] if self else None
+
+class UVTextures(LayerList):
+    def __init__(self, mesh):
+        list.__init__(self)
+        self.mesh = mesh
+
+    def new(self, name="UVMap"):
+        layer = UVTexture(name, len(self.mesh.polygons))
+        self.append(layer)
+        self.mesh.uv_layers.append(UVLayer(name, len(self.mesh.loops)))
+        return layer
+
+class MeshPolygon:
+    __slots__ = ('loop_start', 'loop_total', 'vertices')
+
+    def __init__(self, mesh, index):
+        self.loop_start = mesh.polygons.attrs['loop_start'][index]
+        self.loop_total = mesh.polygons.attrs['loop_total'][index]
+        self.vertices = mesh.loops.attrs['vertex_index'][self.loop_start:self.loop_start + self.loop_total]
+
+class MeshPolygons(IntArray):
+    def __init__(self, mesh):
+        IntArray.__init__(self, ('loop_start', 'loop_total'))
+        self.mesh = mesh
+
+    def __iter__(self):
+        return (MeshPolygon(self.mesh, i) for i in range(len(self)))
+
+    def __getitem__(self, i):
+        return MeshPolygon(self.mesh, i)
+
+class PolygonLayerValue:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+class PolygonLayers(LayerList):
+    """polygon_layers_string / polygon_layers_float, one value per polygon"""
+    def __init__(self, mesh, default):
+        list.__init__(self)
+        self.mesh = mesh
+        self.default = default
+
+    def new(self, name="PolygonLayer"):
+        layer = UVLayer(name, 0)
+        layer.data = [PolygonLayerValue(self.default) for i in range(len(self.mesh.polygons))]
+        self.append(layer)
+        return layer
+
+    def get(self, name, default=None):
+        for layer in self:
+            if layer.name == name: return layer
+        return default
+
+class Mesh(NamedID):
+    def __init__(self, name):
+        NamedID.__init__(self, name)
+        self.vertices = MeshVertices()
+        self.loops = IntArray(('vertex_index',))
+        self.polygons = MeshPolygons(self)
+        self.uv_layers = LayerList()
+        self.polygon_layers_string = PolygonLayers(self, b'')
+        self.polygon_layers_float = PolygonLayers(self, 0.0)
+        self.uv_textures = UVTextures(self)
+        self.materials = []
+
+    def from_pydata(self, verts, edges, faces):
+        self.vertices.add(len(verts))
+        self.vertices.foreach_set('co', [c for v in verts for c in v])
+        indices = [i for face in faces for i in face]
+        self.loops.add(len(indices))
+        self.loops.foreach_set('vertex_index', indices)
+        self.polygons.add(len(faces))
+        starts = []
+        start = 0
+        for face in faces:
+            starts.append(start)
+            start += len(face)
+        self.polygons.foreach_set('loop_start', starts)
+        self.polygons.foreach_set('loop_total', [len(face) for face in faces])
+
+    def update(self, calc_edges=False):
+        pass
+
+    def copy(self):
+        mesh = data.meshes.new(self.name)
+        mesh.vertices.co = list(self.vertices.co)
+        mesh.loops.attrs = dict((k, list(v)) for k, v in self.loops.attrs.items())
+        mesh.polygons.attrs = dict((k, list(v)) for k, v in self.polygons.attrs.items())
+        for layer, tex in zip(self.uv_layers, self.uv_textures):
+            copied = UVLayer(layer.name, 0)
+            copied.data.uv = list(layer.data.uv)
+            mesh.uv_layers.append(copied)
+            faces = UVTexture(tex.name, 0)
+            faces.data = [TexFace() for face in tex.data]
+            for face, source in zip(faces.data, tex.data): face.image = source.image
+            mesh.uv_textures.append(faces)
+        mesh.materials = list(self.materials)
+        mesh.idProperties = dict(self.idProperties)
+        return mesh
+
+############ objects
+
+class AnimData:
+    def __init__(self):
+        self.action = None
+
+class Object(NamedID):
+    def __init__(self, name, objectData):
+        NamedID.__init__(self, name)
+        self.data = objectData
+        self.type = 'EMPTY' if objectData is None else 'MESH'
+        self.parent = None
+        self.matrix_parent_inverse = Matrix()
+        self.select = False
+        self.layers = [True] + [False] * 19
+        self.lock_location = [False] * 3
+        self.lock_rotation = [False] * 3
+        self.animation_data = None
+        self.rotation_euler = Vector()
+        self.scale = Vector((1.0, 1.0, 1.0))
+        self.location = Vector()
+
+    def __setattr__(self, key, value):
+        if key in ('location', 'rotation_euler', 'scale') and not isinstance(value, Vector): value = Vector(value)
+        if key == 'data':
+            old = self.__dict__.get('data')
+            if old is not None: old.users -= 1
+            if value is not None: value.users += 1
+        NamedID.__setattr__(self, key, value)
+
+    def animation_data_create(self):
+        if self.animation_data is None: self.animation_data = AnimData()
+        return self.animation_data
+
+    @property
+    def children(self):
+        # Blender 2.7x scans every object as well
+        return tuple(ob for ob in data.objects if ob.parent is self)
+
+    @property
+    def matrix_local(self):
+        return Matrix(self.location)
+
+    @property
+    def matrix_world(self):
+        matrix = Matrix(self.location)
+        if self.parent is not None: matrix = self.parent.matrix_world * self.matrix_parent_inverse * matrix
+        return matrix
+
+    @property
+    def bound_box(self):
+        if self.data is None or not len(self.data.vertices): return [(0.0, 0.0, 0.0)] * 8
+        co = self.data.vertices.co
+        xs, ys, zs = co[0::3], co[1::3], co[2::3]
+        lo = (min(xs), min(ys), min(zs))
+        hi = (max(xs), max(ys), max(zs))
+        return [(lo[0], lo[1], lo[2]), (lo[0], lo[1], hi[2]), (lo[0], hi[1], hi[2]), (lo[0], hi[1], lo[2]),
+                (hi[0], lo[1], lo[2]), (hi[0], lo[1], hi[2]), (hi[0], hi[1], hi[2]), (hi[0], hi[1], lo[2])]
+
+############ materials and images
+
+class Image(NamedID):
+    def __init__(self, name, width=0, height=0, alpha=False):
+        NamedID.__init__(self, name)
+        self.size = [width, height]
+        self.filepath = ''
+        self.filepath_raw = ''
+
+    def reload(self):
+        if not self.filepath: return
+        with open(path.abspath(self.filepath), 'rb') as f: header = f.read(24)
+        if header[12:16] == b'IHDR': self.size = list(struct.unpack('>II', header[16:24]))
+
+class Images(Collection):
+    def load(self, filepath):
+        if not os.path.exists(filepath): raise RuntimeError("Error: Cannot read image file '%s'" % filepath)
+        img = self.new(os.path.basename(filepath))
+        img.filepath = img.filepath_raw = filepath
+        img.reload()
+        return img
+
+class Texture(NamedID):
+    def __init__(self, name, type='IMAGE'):
+        NamedID.__init__(self, name)
+        self.type = type
+        self.image = None
+
+class TextureSlot:
+    def __init__(self):
+        self.texture = None
+        self.texture_coords = 'ORCO'
+
+class TextureSlots(list):
+    def add(self):
+        slot = TextureSlot()
+        self.append(slot)
+        return slot
+
+class Material(NamedID):
+    def __init__(self, name):
+        NamedID.__init__(self, name)
+        self.use_shadeless = False
+        self.use_transparency = False
+        self.texture_slots = TextureSlots()
+
+class Action(NamedID):
+    """Only marks an object as animated"""
+
+class BlendData:
+    def __init__(self):
+        self.actions = Collection(Action)
+        self.objects = Collection(Object)
+        self.meshes = Collection(Mesh)
+        self.materials = Collection(Material)
+        self.textures = Collection(Texture)
+        self.images = Images(Image)
+
+data = BlendData()
+
+############ scene and context
+
+class SceneObjects:
+    def __init__(self):
+        self.linked = {}
+        self.active = None
+
+    def link(self, ob):
+        if ob in self.linked: raise RuntimeError("Object '%s' already in scene" % ob.name)
+        self.linked[ob] = True
+        ob.users += 1
+
+    def unlink(self, ob):
+        del self.linked[ob]
+        ob.users -= 1
+
+    def __iter__(self):
+        return iter(list(self.linked))
+
+    def __len__(self):
+        return len(self.linked)
+
+    def __contains__(self, ob):
+        if isinstance(ob, str): return any(linked.name == ob for linked in self.linked)
+        return ob in self.linked
+
+class Scene(ID):
+    def __init__(self, name):
+        ID.__init__(self, name)
+        self.objects = SceneObjects()
+        self.layers = [True] + [False] * 19
+        self.frame_start = 1
+        self.frame_end = 250
+        self.frame_current = 1
+
+    def update(self):
+        pass
+
+    def frame_set(self, frame):
+        self.frame_current = frame
+        for handler in app.handlers.frame_change_pre: handler(self)
+
+class WindowManager:
+    def progress_begin(self, start, end): pass
+    def progress_update(self, value): pass
+    def progress_end(self): pass
+    def fileselect_add(self, operator): pass
+    def invoke_props_dialog(self, operator): return {'RUNNING_MODAL'}
+    def invoke_search_popup(self, operator): pass
+
+class Context:
+    def __init__(self):
+        self.scene = Scene("Scene")
+        self.window_manager = WindowManager()
+        self.mode = 'OBJECT'
+        self.space_data = None
+
+    @property
+    def active_object(self):
+        return self.scene.objects.active
+
+    @property
+    def selected_objects(self):
+        return [ob for ob in self.scene.objects if ob.select]
+
+context = Context()
+data.scenes = Collection(Scene)
+data.scenes.add(context.scene)
+
+############ properties, operators, registration
+
+props = submodule('props')
+
+class Property:
+    """Property definition; stored per instance like an RNA property"""
+    def __init__(self, default=None, **options):
+        self.default = default
+        self.options = options
+
+    def __get__(self, instance, owner):
+        if instance is None: return self
+        values = instance.__dict__.setdefault('rnaValues', {})
+        return values.get(self, self.default)
+
+    def __set__(self, instance, value):
+        instance.__dict__.setdefault('rnaValues', {})[self] = value
+
+def propertyFactory(default):
+    def factory(**options):
+        options.setdefault('default', default)
+        return Property(**options)
+    return factory
+
+props.BoolProperty = propertyFactory(False)
+props.IntProperty = propertyFactory(0)
+props.FloatProperty = propertyFactory(0.0)
+props.StringProperty = propertyFactory("")
+props.EnumProperty = propertyFactory(None)
+props.FloatVectorProperty = lambda size=3, **options: Property(**dict(options, default=options.get('default', (0.0,) * size)))
+props.IntVectorProperty = lambda size=3, **options: Property(**dict(options, default=options.get('default', (0,) * size)))
+props.CollectionProperty = propertyFactory(())
+props.PointerProperty = propertyFactory(None)
+
+types = submodule('types')
+
+class Operator:
+    bl_options = set()
+
+    def report(self, level, message):
+        self.reports = getattr(self, 'reports', [])
+        self.reports.append((level, message))
+
+class Panel:
+    pass
+
+class Menu(list):
+    def remove(self, func):
+        if func in self: list.remove(self, func)
+
+types.Operator = Operator
+types.Panel = Panel
+types.Scene = Scene
+types.Object = Object
+types.Mesh = Mesh
+types.INFO_MT_mesh_add = Menu()
+
+utils = submodule('utils')
+registered = {}
+
+def register_class(cls):
+    registered[cls.__name__] = cls
+    if hasattr(cls, 'bl_idname'): operators[cls.bl_idname] = cls
+
+def unregister_class(cls):
+    registered.pop(cls.__name__, None)
+    if hasattr(cls, 'bl_idname'): operators.pop(cls.bl_idname, None)
+
+utils.register_class = register_class
+utils.unregister_class = unregister_class
+
+operators = {}
+
+class OperatorNamespace:
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    def __getattr__(self, name):
+        idname = self.namespace + '.' + name
+        def call(*args, **kwargs):
+            cls = operators.get(idname)
+            if cls is None: raise AttributeError("operator %s is not registered" % idname)
+            operator = cls()
+            for key, value in kwargs.items(): setattr(operator, key, value)
+            return operator.execute(context)
+        return call
+
+class Ops:
+    def __getattr__(self, namespace):
+        return OperatorNamespace(namespace)
+
+ops = Ops()
+
+############ app, handlers, paths
+
+app = submodule('app')
+app.binary_path_python = sys.executable
+app.version = (2, 79, 0)
+app.version_string = "fakebpy"
+app.handlers = ModuleType('bpy.app.handlers')
+sys.modules['bpy.app.handlers'] = app.handlers
+app.handlers.persistent = lambda func: func
+for name in ('frame_change_pre', 'frame_change_post', 'undo_post', 'redo_post', 'load_post',
+             'render_init', 'render_pre', 'render_post', 'render_complete', 'render_cancel', 'save_pre', 'save_post'):
+    setattr(app.handlers, name, [])
+
+path = submodule('path')
+path.abspath = lambda filepath: os.path.abspath(filepath[2:]) if filepath.startswith('//') else filepath
+path.relpath = lambda filepath: filepath
@@ -0,0 +1,22 @@
+# Minimal stand-in for Blender's bpy_extras, see fakebpy/bpy.py
+
+import sys
+from types import ModuleType
+
+import bpy
+
+io_utils = ModuleType('bpy_extras.io_utils')
+sys.modules['bpy_extras.io_utils'] = io_utils
+
+class ImportHelper:
+    filepath = bpy.props.StringProperty(subtype='FILE_PATH')
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+class ExportHelper(ImportHelper):
+    check_extension = True
+
+io_utils.ImportHelper = ImportHelper
+io_utils.ExportHelper = ExportHelper
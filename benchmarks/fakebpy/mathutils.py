@@ -0,0 +1,47 @@
+# Minimal stand-in for Blender's mathutils, see fakebpy/bpy.py
+
+class Vector(list):
+    def __init__(self, values=(0.0, 0.0, 0.0)):
+        list.__init__(self, (float(v) for v in values))
+
+    x = property(lambda self: self[0], lambda self, v: self.__setitem__(0, v))
+    y = property(lambda self: self[1], lambda self, v: self.__setitem__(1, v))
+    z = property(lambda self: self[2], lambda self, v: self.__setitem__(2, v))
+
+    def __add__(self, other):
+        return Vector(a + b for a, b in zip(self, other))
+
+    def __sub__(self, other):
+        return Vector(a - b for a, b in zip(self, other))
+
+    # list would extend in place
+    __iadd__ = __add__
+
+    def __truediv__(self, value):
+        return Vector(a / value for a in self)
+
+    def copy(self):
+        return Vector(self)
+
+class Quaternion(list):
+    """Identity only, Matrix has no rotation"""
+    def __init__(self, values=(1.0, 0.0, 0.0, 0.0)):
+        list.__init__(self, (float(v) for v in values))
+
+    def to_euler(self, order='XYZ'):
+        return Vector()
+
+class Matrix:
+    """Translation only, enough for parenting at a location"""
+    def __init__(self, translation=(0.0, 0.0, 0.0)):
+        self.translation = Vector(translation)
+
+    def decompose(self):
+        return self.translation.copy(), Quaternion(), Vector((1.0, 1.0, 1.0))
+
+    def inverted(self):
+        return Matrix([-v for v in self.translation])
+
+    def __mul__(self, other):
+        if isinstance(other, Matrix): return Matrix(self.translation + other.translation)
+        return Vector(other) + self.translation